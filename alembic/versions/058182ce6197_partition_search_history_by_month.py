@@ -0,0 +1,128 @@
+"""Partition search_history by month
+
+Revision ID: 058182ce6197
+Revises: bf22ce2f06b8
+Create Date: 2026-10-17 12:20:03.577190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '058182ce6197'
+down_revision: Union[str, None] = 'bf22ce2f06b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions are named search_history_yYYYYmMM; rows outside of every
+# partition land in search_history_default. New partitions are created ahead
+# of time by the maintenance job (backend/services/history_maintenance.py).
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_search_history_partition(month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month)::date;
+    end_date date := (date_trunc('month', month) + interval '1 month')::date;
+    partition_name text := 'search_history_' || to_char(start_date, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF search_history FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    # A foreign key to a partitioned table must reference the whole primary
+    # key (id, created_at), so the link table loses its foreign key; link rows
+    # are cleaned up by the retention job instead of ON DELETE CASCADE
+    op.drop_constraint('search_history_posts_history_id_fkey', 'search_history_posts', type_='foreignkey')
+
+    op.execute("ALTER TABLE search_history RENAME TO search_history_unpartitioned")
+    op.execute("ALTER SEQUENCE search_history_id_seq OWNED BY NONE")
+    op.drop_index('ix_search_history_user_id_created_at', table_name='search_history_unpartitioned')
+    op.drop_index('ix_search_history_id', table_name='search_history_unpartitioned')
+
+    op.execute("""
+        CREATE TABLE search_history (
+            id integer NOT NULL DEFAULT nextval('search_history_id_seq'),
+            user_id integer REFERENCES users (id),
+            topic varchar,
+            results json,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE search_history_id_seq OWNED BY search_history.id")
+    op.execute("CREATE TABLE search_history_default PARTITION OF search_history DEFAULT")
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+    # Partitions for every month that has data, plus the next two months
+    op.execute("""
+        SELECT create_search_history_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(created_at) FROM search_history_unpartitioned), now())),
+            date_trunc('month', now()) + interval '2 months',
+            interval '1 month'
+        ) AS month
+    """)
+
+    op.execute("""
+        INSERT INTO search_history (id, user_id, topic, results, created_at)
+        SELECT id, user_id, topic, results, COALESCE(created_at, now())
+        FROM search_history_unpartitioned
+    """)
+    op.drop_table('search_history_unpartitioned')
+
+    op.create_index(op.f('ix_search_history_id'), 'search_history', ['id'], unique=False)
+    op.create_index(
+        'ix_search_history_user_id_created_at',
+        'search_history',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE search_history RENAME TO search_history_partitioned")
+    op.execute("ALTER SEQUENCE search_history_id_seq OWNED BY NONE")
+    op.drop_index('ix_search_history_user_id_created_at', table_name='search_history_partitioned')
+    op.drop_index('ix_search_history_id', table_name='search_history_partitioned')
+
+    op.create_table('search_history',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('search_history_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('topic', sa.String(), nullable=True),
+    sa.Column('results', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE search_history_id_seq OWNED BY search_history.id")
+    op.execute("""
+        INSERT INTO search_history (id, user_id, topic, results, created_at)
+        SELECT id, user_id, topic, results, created_at
+        FROM search_history_partitioned
+    """)
+    op.execute("DROP TABLE search_history_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS create_search_history_partition(date)")
+
+    op.create_index(op.f('ix_search_history_id'), 'search_history', ['id'], unique=False)
+    op.create_index(
+        'ix_search_history_user_id_created_at',
+        'search_history',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False
+    )
+    op.execute("DELETE FROM search_history_posts WHERE history_id NOT IN (SELECT id FROM search_history)")
+    op.create_foreign_key(
+        'search_history_posts_history_id_fkey', 'search_history_posts', 'search_history',
+        ['history_id'], ['id'], ondelete='CASCADE'
+    )
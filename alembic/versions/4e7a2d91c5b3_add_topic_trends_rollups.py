@@ -0,0 +1,95 @@
+"""Add topic_trends daily rollups
+
+Revision ID: 4e7a2d91c5b3
+Revises: 058182ce6197
+Create Date: 2026-10-17 13:05:48.221604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7a2d91c5b3'
+down_revision: Union[str, None] = '058182ce6197'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rollups of the existing history, computed the same way as
+# backend/services/trends.py does it for every new search. Compacted entries
+# have no post links left, so they count as searches without posts.
+BACKFILL = r"""
+INSERT INTO topic_trends (
+    topic, day, search_count, post_count, score_sum,
+    positive_count, neutral_count, negative_count, toxicity_sum, word_counts
+)
+WITH entries AS (
+    SELECT
+        id,
+        btrim(regexp_replace(lower(topic), '\s+', ' ', 'g')) AS topic,
+        (created_at AT TIME ZONE 'UTC')::date AS day,
+        lower(results -> 'analysis' ->> 'overall_sentiment') AS sentiment,
+        (results -> 'analysis' ->> 'toxicity_level')::float AS toxicity,
+        results -> 'analysis' -> 'frequent_words' AS words
+    FROM search_history
+    WHERE topic IS NOT NULL
+),
+post_stats AS (
+    SELECT links.history_id, count(*) AS posts, COALESCE(sum(posts.score), 0) AS score_sum
+    FROM search_history_posts links
+    JOIN reddit_posts posts ON posts.id = links.post_id
+    GROUP BY links.history_id
+),
+word_maps AS (
+    SELECT topic, day, jsonb_object_agg(word, searches) AS word_counts
+    FROM (
+        SELECT entries.topic, entries.day, word, count(*) AS searches
+        FROM entries
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE WHEN json_typeof(entries.words) = 'array' THEN entries.words ELSE '[]'::json END
+        ) AS word
+        GROUP BY entries.topic, entries.day, word
+    ) AS counted
+    GROUP BY topic, day
+)
+SELECT
+    entries.topic,
+    entries.day,
+    count(*),
+    COALESCE(sum(post_stats.posts), 0),
+    COALESCE(sum(post_stats.score_sum), 0),
+    count(*) FILTER (WHERE entries.sentiment = 'positive'),
+    count(*) FILTER (WHERE entries.sentiment IS NULL OR entries.sentiment NOT IN ('positive', 'negative')),
+    count(*) FILTER (WHERE entries.sentiment = 'negative'),
+    COALESCE(sum(entries.toxicity), 0),
+    COALESCE(word_maps.word_counts, '{}'::jsonb)
+FROM entries
+LEFT JOIN post_stats ON post_stats.history_id = entries.id
+LEFT JOIN word_maps ON word_maps.topic = entries.topic AND word_maps.day = entries.day
+GROUP BY entries.topic, entries.day, word_maps.word_counts
+"""
+
+
+def upgrade() -> None:
+    op.create_table('topic_trends',
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('search_count', sa.Integer(), nullable=False),
+    sa.Column('post_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.BigInteger(), nullable=False),
+    sa.Column('positive_count', sa.Integer(), nullable=False),
+    sa.Column('neutral_count', sa.Integer(), nullable=False),
+    sa.Column('negative_count', sa.Integer(), nullable=False),
+    sa.Column('toxicity_sum', sa.Float(), nullable=False),
+    sa.Column('word_counts', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('topic', 'day')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('topic_trends')
@@ -0,0 +1,60 @@
+"""Add full-text search vector to search_history
+
+Revision ID: 7d3f0a6b2e18
+Revises: 4e7a2d91c5b3
+Create Date: 2026-10-17 15:41:09.573120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f0a6b2e18'
+down_revision: Union[str, None] = '4e7a2d91c5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same weights as backend/services/post_store.py: topic (A), analysis
+# keywords (B), post titles (C). Compacted entries have no post links left,
+# so only their topic and keywords are indexed.
+BACKFILL = """
+UPDATE search_history history
+SET search_vector =
+    setweight(to_tsvector('english', COALESCE(history.topic, '')), 'A')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT string_agg(word, ' ')
+        FROM json_array_elements_text(
+            CASE WHEN json_typeof(history.results -> 'analysis' -> 'frequent_words') = 'array'
+                 THEN history.results -> 'analysis' -> 'frequent_words' ELSE '[]'::json END
+        ) AS word
+    ), '')), 'B')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT string_agg(posts.title, ' ')
+        FROM search_history_posts links
+        JOIN reddit_posts posts ON posts.id = links.post_id
+        WHERE links.history_id = history.id
+    ), '')), 'C')
+"""
+
+
+def upgrade() -> None:
+    # Added to the partitioned table, so every partition gets the column and
+    # the index, including the ones created later by create_search_history_partition
+    op.add_column('search_history', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(BACKFILL)
+    op.create_index(
+        'ix_search_history_search_vector',
+        'search_history',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_history_search_vector', table_name='search_history')
+    op.drop_column('search_history', 'search_vector')
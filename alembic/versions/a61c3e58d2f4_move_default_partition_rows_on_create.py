@@ -0,0 +1,77 @@
+"""Move rows out of search_history_default when a partition is created
+
+Revision ID: a61c3e58d2f4
+Revises: 7d3f0a6b2e18
+Create Date: 2026-10-17 18:05:42.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a61c3e58d2f4'
+down_revision: Union[str, None] = '7d3f0a6b2e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# CREATE TABLE ... PARTITION OF fails once rows of that month are in the
+# default partition (e.g. when maintenance lagged behind). The partition is
+# now created as a plain table, the month's rows are moved into it from the
+# default partition, and it is attached. ATTACH only takes SHARE UPDATE
+# EXCLUSIVE on search_history, unlike PARTITION OF, so history queries keep
+# running meanwhile.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_search_history_partition(month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month)::date;
+    end_date date := (date_trunc('month', month) + interval '1 month')::date;
+    partition_name text := 'search_history_' || to_char(start_date, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE search_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+            partition_name
+        );
+        EXECUTE format(
+            'WITH moved AS ('
+            '    DELETE FROM search_history_default WHERE created_at >= %L AND created_at < %L RETURNING *'
+            ') INSERT INTO %I SELECT * FROM moved',
+            start_date, end_date, partition_name
+        );
+        EXECUTE format(
+            'ALTER TABLE search_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_search_history_partition(month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month)::date;
+    end_date date := (date_trunc('month', month) + interval '1 month')::date;
+    partition_name text := 'search_history_' || to_char(start_date, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF search_history FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_CREATE_PARTITION_FUNCTION)
@@ -0,0 +1,31 @@
+"""Add (user_id, created_at DESC) index to search_history
+
+Revision ID: bf22ce2f06b8
+Revises: c9be88c56be7
+Create Date: 2026-10-17 11:02:15.904377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf22ce2f06b8'
+down_revision: Union[str, None] = 'c9be88c56be7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_search_history_user_id_created_at',
+        'search_history',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_history_user_id_created_at', table_name='search_history')
@@ -0,0 +1,160 @@
+"""Add normalized reddit_posts store
+
+Revision ID: c9be88c56be7
+Revises: 23655dee37ac
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9be88c56be7'
+down_revision: Union[str, None] = '23655dee37ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+POST_FIELDS = (
+    'id', 'title', 'text', 'url', 'score', 'num_comments',
+    'created_utc', 'subreddit', 'author', 'permalink',
+)
+
+search_history = sa.table(
+    'search_history',
+    sa.column('id', sa.Integer()),
+    sa.column('results', sa.JSON()),
+)
+
+reddit_posts = sa.table(
+    'reddit_posts',
+    *(sa.column(field) for field in POST_FIELDS),
+)
+
+search_history_posts = sa.table(
+    'search_history_posts',
+    sa.column('history_id', sa.Integer()),
+    sa.column('post_id', sa.String()),
+    sa.column('position', sa.Integer()),
+)
+
+
+def _load(results):
+    if isinstance(results, str):
+        return json.loads(results)
+    return results or {}
+
+
+def _iter_history(connection, last_id=0):
+    """History rows in id order, fetched in batches"""
+    while True:
+        rows = connection.execute(
+            sa.select(search_history.c.id, search_history.c.results)
+            .where(search_history.c.id > last_id)
+            .order_by(search_history.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _backfill(connection) -> None:
+    """Move posts from search_history.results to reddit_posts + link rows"""
+    for rows in _iter_history(connection):
+        for history_id, raw_results in rows:
+            results = _load(raw_results)
+            if 'post_ids' in results:
+                continue
+            posts = [post for post in results.get('posts', []) if post.get('id')]
+
+            unique = {}
+            for post in posts:
+                unique.setdefault(post['id'], {field: post.get(field) for field in POST_FIELDS})
+            if unique:
+                statement = postgresql.insert(reddit_posts).values(list(unique.values()))
+                connection.execute(statement.on_conflict_do_nothing(index_elements=['id']))
+
+                links, seen = [], set()
+                for position, post in enumerate(posts):
+                    if post['id'] not in seen:
+                        seen.add(post['id'])
+                        links.append({'history_id': history_id, 'post_id': post['id'], 'position': position})
+                connection.execute(sa.insert(search_history_posts).values(links))
+
+            compact = {key: value for key, value in results.items() if key != 'posts'}
+            compact['post_ids'] = [post['id'] for post in posts]
+            connection.execute(
+                sa.update(search_history)
+                .where(search_history.c.id == history_id)
+                .values(results=compact)
+            )
+
+
+def _restore(connection) -> None:
+    """Put the full posts back into search_history.results"""
+    for rows in _iter_history(connection):
+        for history_id, raw_results in rows:
+            results = _load(raw_results)
+            if 'post_ids' not in results:
+                continue
+            posts = connection.execute(
+                sa.select(*(reddit_posts.c[field] for field in POST_FIELDS))
+                .select_from(search_history_posts.join(
+                    reddit_posts, reddit_posts.c.id == search_history_posts.c.post_id
+                ))
+                .where(search_history_posts.c.history_id == history_id)
+                .order_by(search_history_posts.c.position)
+            ).mappings().all()
+            restored = {key: value for key, value in results.items() if key != 'post_ids'}
+            restored['posts'] = [dict(post) for post in posts]
+            connection.execute(
+                sa.update(search_history)
+                .where(search_history.c.id == history_id)
+                .values(results=restored)
+            )
+
+
+def upgrade() -> None:
+    op.create_table('reddit_posts',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('text', sa.Text(), nullable=True),
+    sa.Column('url', sa.String(), nullable=True),
+    sa.Column('score', sa.Integer(), nullable=True),
+    sa.Column('num_comments', sa.Integer(), nullable=True),
+    sa.Column('created_utc', sa.Float(), nullable=True),
+    sa.Column('subreddit', sa.String(), nullable=True),
+    sa.Column('author', sa.String(), nullable=True),
+    sa.Column('permalink', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reddit_posts_updated_at'), 'reddit_posts', ['updated_at'], unique=False)
+    op.create_table('search_history_posts',
+    sa.Column('history_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.String(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['history_id'], ['search_history.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['reddit_posts.id'], ),
+    sa.PrimaryKeyConstraint('history_id', 'post_id')
+    )
+    op.create_index(op.f('ix_search_history_posts_post_id'), 'search_history_posts', ['post_id'], unique=False)
+
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    _restore(op.get_bind())
+
+    op.drop_index(op.f('ix_search_history_posts_post_id'), table_name='search_history_posts')
+    op.drop_table('search_history_posts')
+    op.drop_index(op.f('ix_reddit_posts_updated_at'), table_name='reddit_posts')
+    op.drop_table('reddit_posts')
@@ -0,0 +1,29 @@
+"""Keep the search-time values of every post with its history link
+
+Revision ID: e4b9c2d7f150
+Revises: a61c3e58d2f4
+Create Date: 2026-10-17 21:12:37.402961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c2d7f150'
+down_revision: Union[str, None] = 'a61c3e58d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing links keep NULL: their posts are read from reddit_posts as before,
+    # the search-time values and annotations of those entries are already lost
+    op.add_column('search_history_posts', sa.Column('snapshot', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('search_history_posts', 'snapshot')
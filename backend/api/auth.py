@@ -4,20 +4,31 @@ from pathlib import Path
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, tuple_
+import base64
 import logging
 import sys
-from backend.models.user import UserCreate, User, Token, TokenData, SearchHistory, SearchHistoryCreate
+from backend.models.user import (
+    UserCreate, User, Token, TokenData, SearchHistory, SearchHistoryCreate,
+    SearchHistorySummary, SearchHistoryPage, SearchHistorySearchHit, SearchHistorySearchPage,
+)
 from backend.models.db_models import User as DBUser, SearchHistory as DBSearchHistory
-from backend.database import get_async_session
+from backend.database import get_async_session, AsyncSessionLocal
 from backend.config import settings
+from backend.services.user_cache import CachedUser, user_cache
+from backend.services.executor import run_blocking
+from backend.services.post_store import (
+    SEARCH_CONFIG, save_history, hydrate_history, load_history_json,
+)
+from backend.services.serialization import RawJSONResponse
+from backend.services.timing import span
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -62,14 +73,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     logger.debug("==================== END create_access_token ====================")
     return token
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_async_session)
-) -> DBUser:
-    """Получение текущего пользователя из токена"""
-    logger.debug("==================== START get_current_user ====================")
-    logger.debug(f"Received token (first 10 chars): {token[:10]}...")
-    
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CachedUser:
+    """
+    Получение текущего пользователя из токена.
+
+    Validated tokens are cached together with a snapshot of the user, so
+    repeated requests with the same token skip the JWT decode and the DB query.
+    The lookup uses its own short session rather than the request's one, so
+    no connection stays checked out for the rest of the request.
+    """
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -77,48 +93,39 @@ async def get_current_user(
     )
     
     try:
-        logger.debug(f"JWT_SECRET_KEY (first 10 chars): {settings.JWT_SECRET_KEY[:10]}...")
-        logger.debug(f"JWT_ALGORITHM: {settings.JWT_ALGORITHM}")
-        
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        logger.debug(f"Token decoded successfully. Payload: {payload}")
-        
+        with span("auth_jwt"):
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             logger.error("❌ No username found in token payload")
             raise credentials_exception
-        
-        logger.debug(f"✅ Username extracted from token: {username}")
-        token_data = TokenData(username=username)
-        
     except JWTError as jwt_error:
         logger.error(f"❌ JWT decode error: {str(jwt_error)}")
-        logger.error("==================== END get_current_user (with error) ====================")
         raise credentials_exception
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Unexpected error during token processing: {str(e)}")
-        logger.error("==================== END get_current_user (with error) ====================")
         raise credentials_exception
 
     try:
-        logger.debug(f"Querying database for user: {username}")
-        result = await session.execute(select(DBUser).where(DBUser.username == username))
-        user = result.scalar_one_or_none()
-        
-        if user is None:
-            logger.error(f"❌ User not found in database: {username}")
-            logger.error("==================== END get_current_user (with error) ====================")
-            raise credentials_exception
-        
-        logger.debug(f"✅ User found successfully: {user.username}")
-        logger.debug("==================== END get_current_user ====================")
-        return user
-        
+        with span("auth_db"):
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(DBUser).where(DBUser.username == username))
+                user = result.scalar_one_or_none()
     except Exception as db_error:
         logger.error(f"❌ Database error: {str(db_error)}")
-        logger.error("==================== END get_current_user (with error) ====================")
         raise credentials_exception
 
+    if user is None or user.is_active is False:
+        logger.error(f"❌ User not found in database or inactive: {username}")
+        raise credentials_exception
+
+    cached_user = CachedUser.from_db(user)
+    user_cache.set(token, cached_user, payload.get("exp"))
+    logger.debug(f"✅ User resolved from database: {username}")
+    return cached_user
+
 @router.post("/register", response_model=User)
 async def register(
     user: UserCreate,
@@ -145,7 +152,7 @@ async def register(
     db_user = DBUser(
         username=user.username,
         email=user.email,
-        hashed_password=get_password_hash(user.password)
+        hashed_password=await run_blocking(get_password_hash, user.password)
     )
     session.add(db_user)
     await session.commit()
@@ -162,7 +169,7 @@ async def login(
     result = await session.execute(select(DBUser).where(DBUser.username == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await run_blocking(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -176,7 +183,7 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: DBUser = Depends(get_current_user)):
+async def read_users_me(current_user: CachedUser = Depends(get_current_user)):
     """Получение информации о текущем пользователе"""
     return User(
         id=current_user.id,
@@ -187,7 +194,7 @@ async def read_users_me(current_user: DBUser = Depends(get_current_user)):
 
 @router.get("/me/history", response_model=List[SearchHistory])
 async def get_user_history(
-    current_user: DBUser = Depends(get_current_user),
+    current_user: CachedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Получение истории поиска пользователя"""
@@ -202,7 +209,7 @@ async def get_user_history(
         history = result.scalars().all()
         
         logger.debug(f"Found {len(history)} search history entries")
-        return history
+        return await hydrate_history(session, history)
     except Exception as e:
         logger.error(f"Error getting search history: {str(e)}")
         raise HTTPException(
@@ -210,27 +217,152 @@ async def get_user_history(
             detail="Error retrieving search history"
         )
 
+def encode_history_cursor(created_at: datetime, history_id: int) -> str:
+    """Курсор пагинации истории: позиция последней отданной записи"""
+    raw = f"{created_at.isoformat()}|{history_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, history_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(history_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def history_summary_columns():
+    """Columns of SearchHistorySummary, read from the JSON results without loading them"""
+    return (
+        DBSearchHistory.id,
+        DBSearchHistory.topic,
+        DBSearchHistory.created_at,
+        DBSearchHistory.results["analysis"]["overall_sentiment"].as_string().label("overall_sentiment"),
+        func.coalesce(
+            func.json_array_length(DBSearchHistory.results["post_ids"]),
+            DBSearchHistory.results["post_count"].as_integer(),
+            0
+        ).label("post_count"),
+    )
+
+@router.get("/me/history/page", response_model=SearchHistoryPage)
+async def get_user_history_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: CachedUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Страница истории поиска пользователя (новые записи первыми).
+
+    Returns summaries without results; pass next_cursor back as cursor
+    to get the following page. Full entries are served by
+    GET /me/history/{history_id}.
+    """
+    query = (
+        select(*history_summary_columns())
+        .where(DBSearchHistory.user_id == current_user.id)
+        .order_by(DBSearchHistory.created_at.desc(), DBSearchHistory.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        created_at, history_id = decode_history_cursor(cursor)
+        query = query.where(
+            tuple_(DBSearchHistory.created_at, DBSearchHistory.id) < tuple_(created_at, history_id)
+        )
+
+    try:
+        rows = (await session.execute(query)).mappings().all()
+    except Exception as e:
+        logger.error(f"Error getting search history page: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving search history"
+        )
+
+    items = [SearchHistorySummary(**row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_history_cursor(items[-1].created_at, items[-1].id)
+    return SearchHistoryPage(items=items, next_cursor=next_cursor)
+
+@router.get("/me/history/search", response_model=SearchHistorySearchPage)
+async def search_user_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: CachedUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Полнотекстовый поиск по истории пользователя.
+
+    Matches the topic, the analysis keywords and the post titles of every
+    entry (web search syntax: quotes, OR, -word), best matches first. Pass
+    next_offset back as offset to get the following page.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(DBSearchHistory.search_vector, ts_query)
+    query = (
+        select(*history_summary_columns(), rank.label("rank"))
+        .where(
+            DBSearchHistory.user_id == current_user.id,
+            DBSearchHistory.search_vector.op("@@")(ts_query),
+        )
+        .order_by(rank.desc(), DBSearchHistory.created_at.desc(), DBSearchHistory.id.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    )
+
+    try:
+        rows = (await session.execute(query)).mappings().all()
+    except Exception as e:
+        logger.error(f"Error searching search history: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error searching search history"
+        )
+
+    items = [SearchHistorySearchHit(**row) for row in rows[:limit]]
+    next_offset = offset + limit if len(rows) > limit else None
+    return SearchHistorySearchPage(items=items, next_offset=next_offset)
+
+@router.get("/me/history/{history_id}", response_model=SearchHistory)
+async def get_user_history_entry(
+    history_id: int,
+    current_user: CachedUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Получение одной записи истории поиска с результатами"""
+    # JSON is assembled by Postgres and sent as is
+    payload = await load_history_json(session, history_id, current_user.id)
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Search history entry not found"
+        )
+    return RawJSONResponse(payload)
+
 @router.post("/me/history", response_model=SearchHistory)
 async def create_search_history(
     history: SearchHistoryCreate,
-    current_user: DBUser = Depends(get_current_user),
+    current_user: CachedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Создание записи в истории поиска"""
     logger.debug(f"Creating search history for user: {current_user.username}")
     
     try:
-        db_history = DBSearchHistory(
-            user_id=current_user.id,
-            topic=history.topic,
-            results=history.results
+        # Client-supplied posts are kept with the entry: they must not
+        # overwrite the shared reddit_posts rows other histories show
+        db_history = await save_history(
+            session, current_user.id, history.topic, history.results.model_dump(), store_posts=False
         )
-        session.add(db_history)
-        await session.commit()
         await session.refresh(db_history)
         
         logger.debug(f"Created search history entry with ID: {db_history.id}")
-        return db_history
+        return (await hydrate_history(session, [db_history]))[0]
     except Exception as e:
         logger.error(f"Error creating search history: {str(e)}")
         raise HTTPException(
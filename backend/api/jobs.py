@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+import logging
+from backend.api.auth import get_current_user
+from backend.services.user_cache import CachedUser
+from backend.models.search import SearchRequest, SearchJob
+from backend.services.jobs import search_jobs
+
+logger = logging.getLogger(__name__)
+
+# Инициализация router
+router = APIRouter(prefix="/search/jobs", tags=["search"])
+
+@router.post("", response_model=SearchJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_search_job(
+    request: SearchRequest,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """Постановка поиска в очередь; результат забирается через GET /search/jobs/{job_id}"""
+    try:
+        job = await search_jobs.submit(current_user.id, request)
+    except Exception as e:
+        logger.error(f"Error submitting search job: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Error submitting search job"
+        )
+    logger.debug(f"Submitted search job {job['id']} for user {current_user.username}")
+    return job
+
+@router.get("/{job_id}", response_model=SearchJob)
+async def get_search_job(
+    job_id: str,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """Статус и результат поиска, поставленного в очередь"""
+    job = await search_jobs.get(job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Search job not found"
+        )
+    return job
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+from backend.api.auth import get_current_user
+from backend.database import get_async_session
+from backend.models.trends import TopicTrend
+from backend.services.trends import get_topic_trend, normalize_topic
+from backend.services.user_cache import CachedUser
+
+logger = logging.getLogger(__name__)
+
+# Инициализация router
+router = APIRouter(prefix="/trends", tags=["trends"])
+
+@router.get("/{topic}", response_model=TopicTrend)
+async def get_trend(
+    topic: str,
+    days: int = Query(30, ge=1, le=365),
+    current_user: CachedUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Дневной временной ряд по теме из агрегатов topic_trends (без чтения истории)"""
+    points = await get_topic_trend(session, topic, days)
+    return {"topic": normalize_topic(topic), "days": days, "points": points}
@@ -0,0 +1,156 @@
+"""
+Concurrent search capacity of the connection pool.
+
+Fires --searches concurrent /api/search requests at the app in-process
+(httpx ASGI transport), with Reddit and OpenAI replaced by the replay
+stand-ins (backend/benchmarks/replay.py) and the configured database, and
+reports how many searches ran without waiting for a connection, the pool
+timeouts and the peak of checked-out connections. Every search has its own
+topic, so none is served from the search cache, and is made by one of
+--users users (one per search by default); their first search misses the
+auth cache and looks the user up in the database. A single search runs first
+on its own: its latency is the baseline for "without waiting", and it
+loads the background corpus and the tokenizer outside the measurement.
+
+A search that holds a connection across the Reddit and OpenAI calls caps
+the concurrent searches at pool size + overflow; the rest wait and finish
+in multiples of the baseline, or time out. Run the same command on an
+earlier commit to compare.
+
+The pool settings are applied through the environment before the app is
+imported; the Reddit budget is raised so the scheduler does not throttle
+the searches.
+
+Usage:
+    python backend/benchmarks/db_pool.py --searches 50 --pool-size 5 --max-overflow 10 \\
+        --reddit-latency-ms 500 --openai-latency-ms 1500
+"""
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+import httpx
+
+from backend.benchmarks.replay import (
+    Cassette,
+    ReplayOpenAITransport,
+    ReplayReddit,
+    install_openai_transport,
+)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--pool-timeout", type=float, default=30.0)
+    parser.add_argument("--cassette", help="recorded responses (synthetic data if omitted)")
+    parser.add_argument("--reddit-latency-ms", type=float, default=500)
+    parser.add_argument("--openai-latency-ms", type=float, default=1500)
+    parser.add_argument("--limit", type=int, default=20, help="posts per search source")
+    parser.add_argument("--users", type=int, help="distinct users (default: one per search)")
+    parser.add_argument("--username", default="poolbench")
+    parser.add_argument("--password", default="poolbench-password")
+    args = parser.parse_args()
+
+    # backend.config reads the settings when it is first imported, so the
+    # app and the benchmark helpers that use it are imported below
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    os.environ["DB_POOL_TIMEOUT"] = str(args.pool_timeout)
+    os.environ.setdefault("REDDIT_REQUESTS_PER_MINUTE", "100000")
+
+    # The app logs every request at DEBUG; that would dominate the measurement
+    logging.disable(logging.INFO)
+
+    from backend.benchmarks.load import authenticate
+    from backend.benchmarks.login_storm import percentile
+    from backend.database import engine
+    from backend.main import app
+    from backend.services.cache import search_cache
+    from backend.services.executor import executor
+    from backend.services.reddit_scheduler import reddit_scheduler
+
+    cassette = Cassette.load(args.cassette)
+    app.reddit = ReplayReddit(cassette, args.reddit_latency_ms / 1000)
+    openai_transport = ReplayOpenAITransport(cassette, args.openai_latency_ms / 1000)
+    install_openai_transport(openai_transport)
+
+    latencies = []
+    errors = 0
+    timeouts = 0
+    peak = 0
+
+    async def watch_pool():
+        nonlocal peak
+        while True:
+            peak = max(peak, engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        run_id = uuid.uuid4().hex[:8]
+        tokens = [
+            await authenticate(client, f"{args.username}{user}", args.password)
+            for user in range(args.users or args.searches)
+        ]
+        baseline_token = await authenticate(client, args.username, args.password)
+
+        async def search(index, token, record=True):
+            nonlocal errors, timeouts
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/search",
+                json={"topic": f"pool benchmark {run_id} {index}", "limit": args.limit},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            if response.status_code >= 400:
+                errors += 1
+                # sqlalchemy.exc.TimeoutError: "QueuePool limit of size ... reached"
+                if "QueuePool limit" in response.text:
+                    timeouts += 1
+                return
+            if record:
+                latencies.append(time.perf_counter() - started)
+            return time.perf_counter() - started
+
+        baseline = await search("baseline", baseline_token, record=False)
+        if baseline is None:
+            raise SystemExit("the baseline search failed")
+
+        watcher = asyncio.create_task(watch_pool())
+        started = time.perf_counter()
+        await asyncio.gather(*(search(index, tokens[index % len(tokens)]) for index in range(args.searches)))
+        elapsed = time.perf_counter() - started
+        watcher.cancel()
+
+    # Searches that never waited for a connection finish in about the baseline
+    parallel = sum(1 for latency in latencies if latency < baseline * 1.5)
+    print(
+        f"pool={args.pool_size}+{args.max_overflow}: baseline={baseline:5.2f}s, "
+        f"{elapsed:6.2f}s total, {len(latencies)} done, "
+        f"{errors} errors ({timeouts} pool timeouts), {parallel} without waiting, "
+        f"peak connections={peak}, "
+        f"p50={percentile(latencies, 0.5):5.2f}s p99={percentile(latencies, 0.99):5.2f}s"
+    )
+    print(f"stand-in calls: reddit={app.reddit.calls} openai={openai_transport.calls}")
+
+    await reddit_scheduler.close()
+    await search_cache.close()
+    executor.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+End-to-end load benchmark.
+
+Drives /api/search, /api/auth/login and /api/auth/me/history of the app
+in-process (httpx ASGI transport) at a fixed concurrency and reports
+latency percentiles and throughput per scenario. Reddit and OpenAI are
+replaced by the replay stand-ins (backend/benchmarks/replay.py), so only a
+database is needed, no network. Searches still go through the Reddit
+scheduler, so raise REDDIT_REQUESTS_PER_MINUTE to measure anything but the
+configured Reddit budget.
+
+Usage:
+    python backend/benchmarks/load.py --concurrency 20 --requests 200
+    python backend/benchmarks/load.py --cassette cassette.json --topics 5 \\
+        --reddit-latency-ms 400 --openai-latency-ms 1500 --scenarios search
+"""
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from backend.benchmarks.login_storm import percentile
+from backend.benchmarks.replay import (
+    Cassette,
+    ReplayOpenAITransport,
+    ReplayReddit,
+    install_openai_transport,
+)
+
+SCENARIOS = ("login", "history", "search")
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Run requests calls with concurrency workers; returns the summary"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await call(index)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def report(name, summary):
+    print(
+        f"{name:>8}: {summary['requests']:5d} requests, {summary['errors']:4d} errors, "
+        f"{summary['throughput']:7.1f} req/s, "
+        f"p50={summary['p50'] * 1000:7.1f}ms "
+        f"p95={summary['p95'] * 1000:7.1f}ms "
+        f"p99={summary['p99'] * 1000:7.1f}ms"
+    )
+
+
+async def authenticate(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """Register the benchmark user if needed and return a bearer token"""
+    await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password,
+    })
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--cassette", help="recorded responses (synthetic data if omitted)")
+    parser.add_argument("--reddit-latency-ms", type=float, default=300)
+    parser.add_argument("--openai-latency-ms", type=float, default=1000)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--topics", type=int, default=10, help="distinct search topics (fewer means more cache hits)")
+    parser.add_argument("--limit", type=int, default=20, help="posts per search source")
+    parser.add_argument("--username", default="loadbench")
+    parser.add_argument("--password", default="loadbench-password")
+    args = parser.parse_args()
+
+    # The app logs every request at DEBUG; that would dominate the measurement
+    logging.disable(logging.INFO)
+
+    from backend.main import app
+    from backend.services.cache import search_cache
+    from backend.services.executor import executor
+    from backend.services.reddit_scheduler import reddit_scheduler
+
+    cassette = Cassette.load(args.cassette)
+    jitter = args.jitter_ms / 1000
+    app.reddit = ReplayReddit(cassette, args.reddit_latency_ms / 1000, jitter)
+    openai_transport = ReplayOpenAITransport(cassette, args.openai_latency_ms / 1000, jitter)
+    install_openai_transport(openai_transport)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = await authenticate(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        calls = {
+            "login": lambda index: client.post(
+                "/api/auth/login", data={"username": args.username, "password": args.password}
+            ),
+            "history": lambda index: client.get("/api/auth/me/history", headers=headers),
+            "search": lambda index: client.post(
+                "/api/search",
+                json={"topic": f"benchmark topic {index % args.topics}", "limit": args.limit},
+                headers=headers,
+            ),
+        }
+        for name in args.scenarios:
+            summary = await run_scenario(name, calls[name], args.requests, args.concurrency)
+            report(name, summary)
+
+    print(f"stand-in calls: reddit={app.reddit.calls} openai={openai_transport.calls}")
+    await reddit_scheduler.close()
+    await search_cache.close()
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
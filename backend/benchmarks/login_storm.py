@@ -0,0 +1,95 @@
+"""
+Login storm benchmark.
+
+Runs many concurrent bcrypt verifications (what /api/auth/login does) and
+measures how late a 10 ms ticker task wakes up meanwhile. With the hashing
+inline the ticker is starved for the whole storm; with the hashing offloaded
+to the shared executor its lag stays close to zero.
+
+Usage:
+    python backend/benchmarks/login_storm.py --logins 50
+"""
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+import argparse
+import asyncio
+import time
+from passlib.context import CryptContext
+from backend.services.executor import BlockingExecutor
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+TICK_SECONDS = 0.01
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_storm(logins, hashed, executor=None):
+    lags = []
+    stop = asyncio.Event()
+    ticker_task = asyncio.create_task(ticker(lags, stop))
+
+    async def login():
+        if executor is None:
+            pwd_context.verify("password", hashed)
+        else:
+            await executor.run(pwd_context.verify, "password", hashed)
+        # Yield to the loop the way a real handler would between awaits
+        await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker_task
+    return elapsed, lags
+
+
+def report(name, elapsed, lags):
+    print(
+        f"{name:>10}: {elapsed:6.2f}s total, "
+        f"loop lag p50={percentile(lags, 0.5) * 1000:7.1f}ms "
+        f"p99={percentile(lags, 0.99) * 1000:7.1f}ms "
+        f"max={max(lags, default=0.0) * 1000:7.1f}ms "
+        f"ticks={len(lags)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("password")
+
+    elapsed, lags = await run_storm(args.logins, hashed)
+    report("inline", elapsed, lags)
+
+    executor = BlockingExecutor(threads=args.threads)
+    elapsed, lags = await run_storm(args.logins, hashed, executor)
+    report("offloaded", elapsed, lags)
+    print(f"executor stats: {executor.stats()}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,321 @@
+"""
+Offline stand-ins for Reddit and OpenAI.
+
+ReplayReddit implements the part of asyncpraw the search pipeline uses
+(subreddit().search() and submission() with comments) and serves listings
+from a cassette. ReplayOpenAITransport is an httpx transport for the real
+AsyncOpenAI client that answers /chat/completions from the same cassette,
+so the SDK's request and response handling still runs. Both sleep for a
+configurable latency per call.
+
+A cassette is a JSON file:
+    {
+        "reddit": {"<subreddit>|<topic>|<sort>|<time_filter>": [submission, ...]},
+        "comments": {"<submission id>": ["comment body", ...]},
+        "openai": {"<sha256 of the messages>": <chat completion JSON>}
+    }
+
+Queries missing from the cassette fall back to deterministic synthetic
+posts and a neutral completion, so an empty cassette works too.
+
+Recording (needs live Reddit and OpenAI credentials):
+    python backend/benchmarks/replay.py --out cassette.json python rust "machine learning"
+"""
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SUBMISSION_FIELDS = (
+    "id", "title", "selftext", "url", "score", "num_comments",
+    "created_utc", "subreddit", "author", "permalink",
+)
+
+SYNTHETIC_WORDS = (
+    "release performance update community project library support issue "
+    "feature version question help experience problem great terrible love "
+    "hate works broken fast slow tutorial guide news opinion discussion"
+).split()
+
+
+def listing_key(subreddit: str, topic: str, sort: str, time_filter: str) -> str:
+    return "|".join((subreddit.lower(), " ".join(topic.lower().split()), sort, time_filter))
+
+
+def messages_key(messages: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded Reddit listings, comments and OpenAI completions"""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.reddit: Dict[str, List[Dict[str, Any]]] = data.get("reddit", {})
+        self.comments: Dict[str, List[str]] = data.get("comments", {})
+        self.openai: Dict[str, Dict[str, Any]] = data.get("openai", {})
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "Cassette":
+        if not path:
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"reddit": self.reddit, "comments": self.comments, "openai": self.openai}, f)
+
+    def listing(self, key: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+        submissions = self.reddit.get(key)
+        if submissions is None:
+            submissions = synthetic_listing(key, limit or 100)
+        return submissions[:limit] if limit else submissions
+
+    def completion(self, messages: List[Dict[str, Any]], model: str) -> Dict[str, Any]:
+        recorded = self.openai.get(messages_key(messages))
+        if recorded is not None:
+            return recorded
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4 + 1
+        return {
+            "id": "chatcmpl-replay",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": json.dumps({"overall_sentiment": "neutral", "toxicity_level": 0.1}),
+                },
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 16, "total_tokens": prompt_tokens + 16},
+        }
+
+
+def synthetic_listing(key: str, limit: int) -> List[Dict[str, Any]]:
+    """Deterministic fake submissions for a listing key"""
+    rng = random.Random(key)
+    subreddit, topic = key.split("|")[:2]
+    posts = []
+    for index in range(limit):
+        post_id = hashlib.md5(f"{key}|{index}".encode()).hexdigest()[:7]
+        words = rng.choices(SYNTHETIC_WORDS, k=rng.randint(20, 120))
+        posts.append({
+            "id": post_id,
+            "title": f"{topic} {' '.join(words[:6])}",
+            "selftext": " ".join(words),
+            "url": f"https://reddit.com/r/{subreddit}/comments/{post_id}/",
+            "score": int(rng.paretovariate(1.2)) * 5,
+            "num_comments": int(rng.paretovariate(1.5)) * 3,
+            "created_utc": time.time() - rng.randint(0, 30 * 86400),
+            "subreddit": subreddit if subreddit != "all" else rng.choice(["python", "programming", "technology"]),
+            "author": f"user{rng.randint(1, limit * 2)}",
+            "permalink": f"/r/{subreddit}/comments/{post_id}/",
+        })
+    return posts
+
+
+class _Named:
+    def __init__(self, name: str):
+        self.name = name
+        self.display_name = name
+
+
+class _Comment:
+    def __init__(self, body: str, score: int):
+        self.body = body
+        self.score = score
+        self.depth = 0
+
+
+class _CommentForest:
+    def __init__(self, reddit: "ReplayReddit", submission_id: str):
+        self._reddit = reddit
+        self._submission_id = submission_id
+
+    async def replace_more(self, limit: int = 32) -> list:
+        if limit:
+            await self._reddit._sleep()
+        return []
+
+    async def list(self) -> List[_Comment]:
+        bodies = self._reddit.cassette.comments.get(self._submission_id)
+        if bodies is None:
+            rng = random.Random(self._submission_id)
+            bodies = [" ".join(rng.choices(SYNTHETIC_WORDS, k=rng.randint(5, 40))) for _ in range(10)]
+        return [_Comment(body, len(bodies) - index) for index, body in enumerate(bodies)]
+
+
+class ReplaySubmission:
+    def __init__(self, reddit: "ReplayReddit", data: Dict[str, Any]):
+        self._reddit = reddit
+        self.id = data["id"]
+        self.title = data.get("title", "")
+        self.selftext = data.get("selftext", "")
+        self.url = data.get("url", "")
+        self.score = data.get("score", 0)
+        self.num_comments = data.get("num_comments", 0)
+        self.created_utc = data.get("created_utc", 0.0)
+        self.subreddit = _Named(data.get("subreddit", "all"))
+        self.author = _Named(data["author"]) if data.get("author") else None
+        self.permalink = data.get("permalink", "")
+        self.comment_sort = "confidence"
+        self.comment_limit = None
+        self.comments = _CommentForest(reddit, self.id)
+
+    async def load(self) -> None:
+        await self._reddit._sleep()
+
+
+class ReplaySubreddit:
+    def __init__(self, reddit: "ReplayReddit", name: str):
+        self._reddit = reddit
+        self.display_name = name
+
+    async def search(self, query: str, sort: str = "relevance", time_filter: str = "all", limit: Optional[int] = 100):
+        # Like asyncpraw's ListingGenerator: nothing happens until iteration
+        key = listing_key(self.display_name, query, sort, time_filter)
+        submissions = self._reddit.cassette.listing(key, limit)
+        self._reddit.calls += 1
+        await self._reddit._sleep()
+        for data in submissions:
+            yield ReplaySubmission(self._reddit, data)
+
+
+class ReplayReddit:
+    """asyncpraw.Reddit stand-in serving listings from a cassette"""
+
+    def __init__(self, cassette: Cassette, latency: float = 0.0, jitter: float = 0.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    async def _sleep(self) -> None:
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    async def subreddit(self, name: str) -> ReplaySubreddit:
+        return ReplaySubreddit(self, name)
+
+    async def submission(self, id: str, fetch: bool = True) -> ReplaySubmission:
+        data = next(
+            (post for posts in self.cassette.reddit.values() for post in posts if post["id"] == id),
+            {"id": id},
+        )
+        submission = ReplaySubmission(self, data)
+        if fetch:
+            await submission.load()
+        return submission
+
+    async def close(self) -> None:
+        pass
+
+
+class ReplayOpenAITransport(httpx.AsyncBaseTransport):
+    """httpx transport answering OpenAI chat completions from a cassette"""
+
+    def __init__(self, cassette: Cassette, latency: float = 0.0, jitter: float = 0.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": f"Not recorded: {request.url.path}"}})
+        body = json.loads(await request.aread())
+        self.calls += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        return httpx.Response(200, json=self.cassette.completion(body["messages"], body.get("model", "")))
+
+
+class RecordingOpenAITransport(httpx.AsyncBaseTransport):
+    """httpx transport passing requests to OpenAI and storing the completions"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(await request.aread()) if request.url.path.endswith("/chat/completions") else None
+        response = await self._transport.handle_async_request(request)
+        if body is None:
+            return response
+        content = await response.aread()
+        if response.status_code == 200:
+            self.cassette.openai[messages_key(body["messages"])] = json.loads(content)
+        return httpx.Response(response.status_code, headers=response.headers, content=content)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def install_openai_transport(transport: httpx.AsyncBaseTransport) -> None:
+    """Point the analysis service's OpenAI client at the given transport"""
+    from openai import AsyncOpenAI
+    from backend.config import settings
+    from backend.services import ai_service
+
+    ai_service.client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY or "replay",
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+
+
+async def record(topics: List[str], out: str, limit: int) -> None:
+    """Run the search pipeline against live services and save a cassette"""
+    import asyncpraw
+    from backend.config import settings
+    from backend.models.search import SearchRequest
+    from backend.services.search_service import run_search, search_sources
+
+    cassette = Cassette.load(out) if Path(out).exists() else Cassette()
+    install_openai_transport(RecordingOpenAITransport(cassette))
+    reddit = asyncpraw.Reddit(
+        client_id=settings.REDDIT_CLIENT_ID,
+        client_secret=settings.REDDIT_CLIENT_SECRET,
+        user_agent=settings.REDDIT_USER_AGENT,
+    )
+    try:
+        for topic in topics:
+            request = SearchRequest(topic=topic, limit=limit)
+            for subreddit_name, sort, time_filter in search_sources(request):
+                subreddit = await reddit.subreddit(subreddit_name)
+                submissions = []
+                async for submission in subreddit.search(topic, sort=sort, time_filter=time_filter, limit=limit):
+                    data = {field: getattr(submission, field) for field in SUBMISSION_FIELDS}
+                    data["subreddit"] = submission.subreddit.display_name
+                    data["author"] = submission.author.name if submission.author is not None else None
+                    submissions.append(data)
+                cassette.reddit[listing_key(subreddit_name, topic, sort, time_filter)] = submissions
+            # Records the completions of the analysis through the transport
+            await run_search(reddit, request)
+            print(f"recorded {topic!r}")
+    finally:
+        await reddit.close()
+        cassette.save(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", nargs="+")
+    parser.add_argument("--out", default="cassette.json")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(record(args.topics, args.out, args.limit))
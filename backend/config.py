@@ -5,22 +5,105 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # asyncpg prepared statement cache per connection (0 disables it, e.g. behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
 
     # Reddit API
     REDDIT_CLIENT_ID: str
     REDDIT_CLIENT_SECRET: str
     REDDIT_USER_AGENT: str
 
+    # Reddit API budget shared by all users (Reddit allows 100 requests/minute per OAuth client)
+    REDDIT_REQUESTS_PER_MINUTE: int = 90
+    REDDIT_RATE_LIMIT_BURST: int = 10
+    REDDIT_RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis"
+    SEARCH_FANOUT_CONCURRENCY: int = 4
+
+    # Comment ingestion (SearchRequest.include_comments)
+    COMMENTS_PER_POST: int = 5
+    COMMENTS_MAX_DEPTH: int = 1
+    COMMENTS_REPLACE_MORE_LIMIT: int = 0
+    COMMENTS_CONCURRENCY: int = 8
+    COMMENTS_DEADLINE_SECONDS: float = 5.0
+    COMMENTS_CACHE_TTL_SECONDS: int = 600
+    COMMENTS_CACHE_MAX_ENTRIES: int = 2048
+
     # OpenAI
     OPENAI_API_KEY: str
+    # Shared HTTP pool of the OpenAI client
+    OPENAI_MAX_CONNECTIONS: int = 20
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    OPENAI_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_RETRIES: int = 1
+    # Hedged requests: a second attempt after the recent p95 latency
+    OPENAI_HEDGE_ENABLED: bool = False
+    OPENAI_HEDGE_PERCENTILE: float = 0.95
+    OPENAI_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    OPENAI_HEDGE_MIN_SAMPLES: int = 20
+
+    # Deadline of a whole search request (Reddit, comments and OpenAI)
+    SEARCH_DEADLINE_SECONDS: float = 45.0
 
     # JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Per-process auth cache: bounds how long a user changed in the database keeps being accepted
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
 
     VERCEL_URL: str
 
+    # Cache
+    REDIS_URL: Optional[str] = None
+    SEARCH_CACHE_TTL_SECONDS: int = 300
+    SEARCH_CACHE_MAX_ENTRIES: int = 256
+    ANALYSIS_CACHE_TTL_SECONDS: int = 1800
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 512
+    ANALYSIS_CHUNK_TOKENS: int = 3000
+    ANALYSIS_MAX_CONCURRENCY: int = 4
+    ANALYSIS_COMMENT_TOKENS_PER_POST: int = 200
+    # Token budget of all posts in the prompts; texts are cut by engagement
+    ANALYSIS_PROMPT_TOKEN_BUDGET: int = 6000
+    ANALYSIS_MIN_POST_TOKENS: int = 4
+
+    # Background search jobs
+    JOB_BACKEND: str = "memory"  # "memory" or "redis"
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    # Redis jobs not updated for this long are taken to be left by a dead worker and re-run
+    JOB_LEASE_SECONDS: int = 600
+
+    # Thread pool for blocking work (password hashing)
+    EXECUTOR_THREADS: int = 4
+
+    # Search history retention
+    HISTORY_PARTITIONS_AHEAD: int = 2
+    HISTORY_RETENTION_MONTHS: int = 12  # 0 keeps history forever
+    HISTORY_ARCHIVE_EXPIRED: bool = False  # detach expired partitions (and move expired default-partition rows) instead of dropping them
+    HISTORY_COMPACT_AFTER_DAYS: int = 90
+    HISTORY_COMPACT_BATCH_SIZE: int = 500
+    HISTORY_MAINTENANCE_INTERVAL_SECONDS: int = 3600
+
+    # Local text statistics
+    BACKGROUND_CORPUS_POST_LIMIT: int = 4000
+    BACKGROUND_CORPUS_TTL_SECONDS: int = 600
+
+    # Near-duplicate collapsing (MinHash + LSH) before analysis;
+    # 16 bands x 4 rows put the LSH threshold at about 0.5 Jaccard
+    DEDUP_ENABLED: bool = True
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16
+    DEDUP_SHINGLE_SIZE: int = 2
+    DEDUP_THRESHOLD: float = 0.5
+
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,20 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from backend.config import settings
+from backend.services.serialization import dumps_text, loads
 
-# Создаем асинхронный движок SQLAlchemy
-engine = create_async_engine(settings.DATABASE_URL)
+# Создаем асинхронный движок SQLAlchemy (JSON-колонки кодируются через orjson)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    json_serializer=dumps_text,
+    json_deserializer=loads,
+)
 
 # Создаем фабрику сессий
 AsyncSessionLocal = sessionmaker(
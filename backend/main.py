@@ -2,12 +2,15 @@ import sys
 from pathlib import Path
 import ssl
 import aiohttp
+import asyncio
+import json
 from datetime import datetime
 
 project_root = str(Path(__file__).parent.parent)
 sys.path.append(project_root)
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -15,12 +18,30 @@ import asyncpraw
 import logging
 import sys
 from contextlib import asynccontextmanager
-from backend.services.ai_service import analyze_posts
+from backend.services.search_service import run_search, stream_search, save_search_history
+from backend.services.cache import search_cache
+from backend.services.comments import comment_cache
+from backend.services.executor import executor, run_blocking
+from backend.services.reddit_scheduler import reddit_scheduler
+from backend.services.history_maintenance import maintenance_loop
+from backend.services.timing import start_trace, end_trace, span
+from backend.services.serialization import dumps, RawJSONResponse
+from backend.services.metrics import registry, HTTP_REQUESTS, HTTP_ERRORS
+from backend.services import ai_service
+from backend.services.ai_service import analysis_cache
+from backend.services.prompt_builder import load_encoding
+from backend.services.deadline import deadline, DeadlineExceeded
+from backend.services.user_cache import user_cache
 from backend.config import settings
 from backend.api.auth import router as auth_router
 from backend.api.auth import get_current_user
-from backend.database import get_async_session
+from backend.services.user_cache import CachedUser
+from backend.api.jobs import router as jobs_router
+from backend.api.trends import router as trends_router
+from backend.services.jobs import search_jobs
+from backend.database import get_async_session, AsyncSessionLocal, engine
 from backend.models.db_models import User as DBUser, SearchHistory as DBSearchHistory
+from backend.models.search import SearchRequest, RedditPost, AnalysisResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Configure logging
@@ -48,11 +69,20 @@ async def get_reddit():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create Reddit instance
+    # Startup: load the tokenizer, create Reddit instance, start search workers and history maintenance
+    await run_blocking(load_encoding)
     app.reddit = await get_reddit()
+    search_jobs.start(app.reddit)
+    maintenance_task = asyncio.create_task(maintenance_loop())
     yield
-    # Shutdown: close Reddit instance
+    # Shutdown: stop maintenance and search workers, close Reddit instance, shared cache connections, the OpenAI pool and executor pools
+    maintenance_task.cancel()
+    await search_jobs.stop()
     await app.reddit.close()
+    await reddit_scheduler.close()
+    await search_cache.close()
+    await ai_service.client.close()
+    executor.shutdown()
 
 app = FastAPI(title="Reddit Topic Analyzer", lifespan=lifespan)
 
@@ -75,104 +105,185 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One structured line per request with the stage timings
+request_logger = logging.getLogger("backend.requests")
+
+# Their body runs the search stages, after the headers are sent
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+def _record_request(request: Request, trace, status_code: int) -> None:
+    # The endpoint function name keeps the label set bounded, unlike raw paths
+    endpoint = request.scope.get("endpoint")
+    handler = endpoint.__name__ if endpoint is not None else "unmatched"
+    HTTP_REQUESTS.inc(method=request.method, handler=handler, status=status_code)
+    if status_code >= 500:
+        HTTP_ERRORS.inc(method=request.method, handler=handler)
+    request_logger.info(trace.log_line(
+        method=request.method,
+        path=request.url.path,
+        status=status_code,
+    ))
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Server-Timing header, request metrics and the log line of a request.
+
+    The metrics and the log line are recorded once the body is sent, so a
+    streamed search reports its stages; the Server-Timing header is left out
+    of streamed responses, where it could only show the stages before the
+    first byte.
+    """
+    trace, token = start_trace()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        _record_request(request, trace, 500)
+        raise
+    finally:
+        end_trace(token)
+
+    if not response.headers.get("content-type", "").startswith(STREAMING_MEDIA_TYPES):
+        response.headers["Server-Timing"] = trace.server_timing()
+    body = response.body_iterator
+
+    async def traced_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            _record_request(request, trace, response.status_code)
+
+    response.body_iterator = traced_body()
+    return response
+
+def collect_pool_metrics():
+    pool = engine.pool
+    samples = []
+    for name, getter in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow"), ("checked_in", "checkedin")):
+        if hasattr(pool, getter):
+            samples.append(("db_pool_connections", {"state": name}, getattr(pool, getter)()))
+    return [("db_pool_connections", "gauge", "Database connection pool state", samples)]
+
+def collect_cache_metrics():
+    caches = {
+        "search": search_cache.local.stats(),
+        "analysis": analysis_cache.stats(),
+        "auth": user_cache.stats(),
+        "comments": comment_cache.stats(),
+    }
+    families = []
+    for stat, metric_type, documentation in (
+        ("hits", "counter", "Cache hits"),
+        ("misses", "counter", "Cache misses"),
+        ("size", "gauge", "Cache entries"),
+    ):
+        name = f"cache_{stat}"
+        sample_name = f"{name}_total" if metric_type == "counter" else name
+        samples = [(sample_name, {"cache": cache}, stats[stat]) for cache, stats in caches.items()]
+        families.append((name, metric_type, documentation, samples))
+    return families
+
+def collect_scheduler_metrics():
+    return [("reddit_scheduler_waiting", "gauge", "Searches waiting for Reddit budget",
+             [("reddit_scheduler_waiting", {}, reddit_scheduler.queue_depth())])]
+
+def collect_executor_metrics():
+    stats = executor.stats()
+    return [
+        ("executor_queued", "gauge", "Blocking tasks waiting for a worker", [("executor_queued", {}, stats["queued"])]),
+        ("executor_running", "gauge", "Blocking tasks running", [("executor_running", {}, stats["running"])]),
+    ]
+
+registry.register_collector(collect_pool_metrics)
+registry.register_collector(collect_cache_metrics)
+registry.register_collector(collect_executor_metrics)
+registry.register_collector(collect_scheduler_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Подключаем роутер авторизации с префиксом
 app.include_router(auth_router, prefix="/api")
-
-class SearchRequest(BaseModel):
-    topic: str
-    limit: Optional[int] = 20
-
-class RedditPost(BaseModel):
-    id: str
-    title: str
-    text: str
-    url: str
-    score: int
-    num_comments: int
-    created_utc: float
-    subreddit: str
-    author: str
-    permalink: str
-
-class AnalysisResponse(BaseModel):
-    posts: List[RedditPost]
-    analysis: Dict[str, Any]
+app.include_router(jobs_router, prefix="/api")
+app.include_router(trends_router, prefix="/api")
 
 @app.post("/api/search", response_model=AnalysisResponse)
 async def search_reddit(
     request: SearchRequest,
-    current_user: DBUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_async_session)
+    current_user: CachedUser = Depends(get_current_user)
 ):
     try:
-        logger.debug(f"Searching for topic: {request.topic}")
-        posts = []
-        
-        # Get subreddit instance
-        logger.debug("Getting subreddit instance")
         try:
-            subreddit = await app.reddit.subreddit("all")
-            logger.debug("Successfully got subreddit instance")
-            
-            # Search for submissions
-            logger.debug(f"Starting search with parameters: query='{request.topic}', limit={request.limit}")
-            async for submission in subreddit.search(
-                query=request.topic,
-                sort="hot",
-                time_filter="month",
-                limit=request.limit
-            ):
-                try:
-                    logger.debug(f"Processing submission: {submission.id}")
-                    # Get author name safely    
-                    author_name = "[deleted]"
-                    if submission.author is not None:
-                        author_name = submission.author.name
-
-                    post_data = RedditPost(
-                        id=submission.id,
-                        title=submission.title,
-                        text=submission.selftext,
-                        url=submission.url,
-                        score=submission.score,
-                        num_comments=submission.num_comments,
-                        created_utc=submission.created_utc,
-                        subreddit=submission.subreddit.display_name,
-                        author=author_name,
-                        permalink=f"https://reddit.com{submission.permalink}"
-                    )
-                    posts.append(post_data)
-                    logger.debug(f"Successfully processed submission {submission.id}")
-                except Exception as e:
-                    logger.error(f"Error processing submission {submission.id}: {str(e)}")
-                    continue
-
-            logger.debug(f"Found {len(posts)} posts")
-            
-            # Get AI analysis
-            logger.debug("Starting AI analysis...")
-            analysis_result = await analyze_posts([post.dict() for post in posts])
-            logger.debug("AI analysis completed")
-            
-            # Save search history
-            logger.debug("Saving search history")
-            search_history = DBSearchHistory(
-                user_id=current_user.id,
-                topic=request.topic,
-                results={"posts": [post.dict() for post in posts], "analysis": analysis_result}
-            )
-            session.add(search_history)
-            await session.commit()
-            logger.debug("Search history saved successfully")
-            
-            return AnalysisResponse(posts=posts, analysis=analysis_result)
+            # No DB connection is held while Reddit and OpenAI are called
+            with deadline(settings.SEARCH_DEADLINE_SECONDS):
+                result = await run_search(app.reddit, request, current_user.id)
+
+            # Save search history with a session that lives only for the write
+            async with AsyncSessionLocal() as session:
+                await save_search_history(session, current_user.id, request.topic, result)
+
+            # Posts are already plain dicts: encode once, skip response_model validation
+            with span("serialize"):
+                payload = dumps({"posts": result["posts"], "analysis": result["analysis"]})
+            return RawJSONResponse(payload)
+        except DeadlineExceeded as e:
+            logger.error(f"Search deadline exceeded: {request.topic}")
+            raise HTTPException(status_code=504, detail=str(e))
         except Exception as e:
             logger.error(f"Error in Reddit API operations: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Reddit API error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in search_reddit: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _format_event(event: str, data: Any, sse: bool) -> bytes:
+    if sse:
+        return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+    return dumps({"event": event, "data": data}) + b"\n"
+
+@app.post("/api/search/stream")
+async def search_reddit_stream(
+    request: SearchRequest,
+    http_request: Request,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Streaming variant of /api/search.
+
+    Sends every post as a "post" event as soon as it is parsed, then the
+    per-post scores and clusters as one "annotations" event and the
+    analysis as the final "analysis" event. The response is NDJSON, or
+    Server-Sent Events if the client accepts text/event-stream.
+    """
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    user_id = current_user.id
+
+    async def event_stream():
+        try:
+            with deadline(settings.SEARCH_DEADLINE_SECONDS):
+                async for event, data in stream_search(app.reddit, request, user_id):
+                    if event == "result":
+                        # The request-scoped session is already closed while the
+                        # response streams, so the history is saved with its own one
+                        async with AsyncSessionLocal() as session:
+                            await save_search_history(session, user_id, request.topic, data)
+                        yield _format_event("done", {}, sse)
+                    else:
+                        yield _format_event(event, data, sse)
+        except Exception as e:
+            logger.error(f"Error in search_reddit_stream: {str(e)}")
+            yield _format_event("error", {"detail": str(e)}, sse)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson"
+    )
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
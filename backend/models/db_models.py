@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, ForeignKey, JSON, Text, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -21,11 +22,81 @@ class User(Base):
 class SearchHistory(Base):
     __tablename__ = "search_history"
 
+    # Partitioned by month on created_at, so the primary key in the database
+    # is (id, created_at); id alone is still unique (it comes from a sequence)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     topic = Column(String)
     results = Column(JSON)  # Store search results as JSON
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Full-text search over topic, analysis keywords and post titles,
+    # filled when the entry is saved (services/post_store.py)
+    search_vector = deferred(Column(TSVECTOR))
     
     # Relationship with user
-    user = relationship("User", back_populates="search_history") 
\ No newline at end of file
+    user = relationship("User", back_populates="search_history")
+
+    __table_args__ = (
+        # Keyset pagination of a user's history by (created_at, id)
+        Index("ix_search_history_user_id_created_at", user_id, created_at.desc()),
+        Index("ix_search_history_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    # Posts found by this search, in result order
+    posts = relationship(
+        "SearchHistoryPost",
+        back_populates="history",
+        primaryjoin="SearchHistory.id == foreign(SearchHistoryPost.history_id)",
+        order_by="SearchHistoryPost.position",
+    )
+
+class RedditPost(Base):
+    __tablename__ = "reddit_posts"
+
+    id = Column(String, primary_key=True)  # Reddit submission id
+    title = Column(String)
+    text = Column(Text)
+    url = Column(String)
+    score = Column(Integer)
+    num_comments = Column(Integer)
+    created_utc = Column(Float)
+    subreddit = Column(String)
+    author = Column(String)
+    permalink = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+
+class SearchHistoryPost(Base):
+    __tablename__ = "search_history_posts"
+
+    # No foreign key: search_history is partitioned by month, and orphaned
+    # links are removed by the retention job (services/history_maintenance.py)
+    history_id = Column(Integer, primary_key=True)
+    post_id = Column(String, ForeignKey("reddit_posts.id"), primary_key=True, index=True)
+    position = Column(Integer, nullable=False)
+    # The post as this search returned it: MUTABLE_POST_FIELDS and the
+    # analysis annotations (services/post_store.py); NULL for older entries
+    snapshot = Column(JSONB, nullable=True)
+
+    history = relationship(
+        "SearchHistory",
+        back_populates="posts",
+        primaryjoin="SearchHistory.id == foreign(SearchHistoryPost.history_id)",
+    )
+    post = relationship("RedditPost")
+
+class TopicTrend(Base):
+    __tablename__ = "topic_trends"
+
+    # Per-topic, per-day rollup of saved searches (services/trends.py),
+    # updated in the same transaction as the search history row
+    topic = Column(String, primary_key=True)  # normalized: lower case, single spaces
+    day = Column(Date, primary_key=True)
+    search_count = Column(Integer, nullable=False, default=0)
+    post_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(BigInteger, nullable=False, default=0)
+    positive_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    toxicity_sum = Column(Float, nullable=False, default=0.0)
+    word_counts = Column(JSONB, nullable=False, default=dict)  # word -> number of searches listing it
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
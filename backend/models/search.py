@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal
+
+SearchSort = Literal["relevance", "hot", "top", "new", "comments"]
+SearchTimeFilter = Literal["all", "day", "hour", "month", "week", "year"]
+
+# Posts per source; Reddit search listings end at about 250 results anyway
+MAX_SEARCH_LIMIT = 250
+
+class SearchRequest(BaseModel):
+    topic: str
+    # Per source: every (subreddit, sort, time_filter) combination is one Reddit query
+    limit: int = Field(20, ge=1, le=MAX_SEARCH_LIMIT)
+    subreddits: List[str] = Field(default_factory=lambda: ["all"], min_length=1, max_length=5)
+    sorts: List[SearchSort] = Field(default_factory=lambda: ["hot"], min_length=1, max_length=3)
+    time_filters: List[SearchTimeFilter] = Field(default_factory=lambda: ["month"], min_length=1, max_length=3)
+    # Fetch the top comments of every post and include them in the analysis
+    include_comments: bool = False
+
+class RedditPost(BaseModel):
+    id: str
+    title: str
+    text: str
+    url: str
+    score: int
+    num_comments: int
+    created_utc: float
+    subreddit: str
+    author: str
+    permalink: str
+    comments: Optional[List[str]] = None
+    # Near-duplicate cluster (services/dedup.py): size, and the id of the
+    # post that represents the cluster in the analysis (None for that post)
+    cluster_size: int = 1
+    duplicate_of: Optional[str] = None
+    # Local lexicon scores (services/sentiment.py): -1..1 and 0..1
+    sentiment_score: Optional[float] = None
+    toxicity_score: Optional[float] = None
+
+class AnalysisResponse(BaseModel):
+    posts: List[RedditPost]
+    analysis: Dict[str, Any]
+
+class SearchJob(BaseModel):
+    id: str
+    status: str
+    request: SearchRequest
+    result: Optional[AnalysisResponse] = None
+    history_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,26 @@
+from datetime import date
+from typing import List
+
+from pydantic import BaseModel
+
+
+class SentimentDistribution(BaseModel):
+    positive: int = 0
+    neutral: int = 0
+    negative: int = 0
+
+
+class TrendPoint(BaseModel):
+    day: date
+    searches: int
+    posts: int
+    mean_score: float
+    sentiment: SentimentDistribution
+    mean_toxicity: float
+    top_words: List[str]
+
+
+class TopicTrend(BaseModel):
+    topic: str
+    days: int
+    points: List[TrendPoint]
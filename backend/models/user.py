@@ -1,7 +1,12 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from backend.models.search import RedditPost
+
+# Posts accepted in a history entry sent by the client
+MAX_HISTORY_POSTS = 1000
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
@@ -27,8 +32,16 @@ class SearchHistoryBase(BaseModel):
     topic: str
     results: Dict[str, Any]
 
+class SearchHistoryResults(BaseModel):
+    """Results sent by the client; stored inline with the entry, never in reddit_posts"""
+    posts: List[RedditPost] = Field(default_factory=list, max_length=MAX_HISTORY_POSTS)
+    analysis: Dict[str, Any] = Field(default_factory=dict)
+
+    class Config:
+        extra = "allow"
+
 class SearchHistoryCreate(SearchHistoryBase):
-    pass
+    results: SearchHistoryResults
 
 class SearchHistory(SearchHistoryBase):
     id: int
@@ -36,4 +49,22 @@ class SearchHistory(SearchHistoryBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class SearchHistorySummary(BaseModel):
+    id: int
+    topic: str
+    created_at: datetime
+    overall_sentiment: Optional[str] = None
+    post_count: int = 0
+
+class SearchHistoryPage(BaseModel):
+    items: List[SearchHistorySummary]
+    next_cursor: Optional[str] = None
+
+class SearchHistorySearchHit(SearchHistorySummary):
+    rank: float
+
+class SearchHistorySearchPage(BaseModel):
+    items: List[SearchHistorySearchHit]
+    next_offset: Optional[int] = None
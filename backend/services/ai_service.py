@@ -1,106 +1,386 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from openai import AsyncOpenAI
+import asyncio
+import httpx
+import hashlib
 import logging
 import json
+import math
+import time
+from collections import deque
 from backend.config import settings  # Import settings from centralized config
+from backend.services.cache import TTLCache
+from backend.services.sentiment import aggregate_scores, score_posts, sentiment_label
+from backend.services.text_stats import BackgroundCorpus, compute_post_statistics
+from backend.services.deadline import remaining
+from backend.services.prompt_builder import (
+    ANALYSIS_MODEL,
+    clean_text,
+    compact_posts,
+    count_tokens,
+    truncate_tokens,
+)
+from backend.services.metrics import OPENAI_TOKENS, OPENAI_HEDGES
+from backend.services.timing import span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client without proxies
-client = AsyncOpenAI(
-    api_key=settings.OPENAI_API_KEY,
-    http_client=None  # Let OpenAI create its own client
+def create_openai_client() -> AsyncOpenAI:
+    """OpenAI client on an explicitly sized, shared keep-alive pool"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            settings.OPENAI_TIMEOUT_SECONDS, connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS
+        ),
+    )
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        http_client=http_client,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+    )
+
+client = create_openai_client()
+
+SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+# Memoized analysis results keyed by the content of the analyzed posts
+analysis_cache = TTLCache(
+    maxsize=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl=settings.ANALYSIS_CACHE_TTL_SECONDS,
 )
 
-async def analyze_posts(posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+class LatencyTracker:
+    """Latencies of the recent OpenAI completions, for the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < settings.OPENAI_HEDGE_MIN_SAMPLES:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+completion_latency = LatencyTracker()
+
+def _score_bucket(score: int) -> int:
+    """Logarithmic score bucket so small vote changes keep the same key"""
+    return int(math.copysign(math.floor(math.log2(abs(score) + 1)), score))
+
+def posts_fingerprint(posts: List[Dict[str, Any]]) -> str:
+    """
+    Stable hash of the prompt-relevant fields of the posts.
+
+    The posts are sorted by id, so the same set of posts in a different
+    order produces the same fingerprint.
     """
-    Analyze Reddit posts using OpenAI API to generate insights.
+    material = sorted(
+        (post["id"], post["title"], post["text"], _score_bucket(post["score"]), post.get("comments") or [])
+        for post in posts
+    )
+    payload = json.dumps(material, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def format_comments(comments: List[str], token_budget: int) -> str:
+    """Top comments of a post, cut to the per-post token budget"""
+    lines = []
+    for comment in comments:
+        line = "> " + clean_text(comment)
+        tokens = count_tokens(line)
+        if tokens > token_budget:
+            # Cut the last comment to what is left of the budget
+            if token_budget > 10:
+                lines.append(truncate_tokens(line, token_budget))
+            break
+        lines.append(line)
+        token_budget -= tokens
+    return "\n".join(lines)
+
+def format_post(post: Dict[str, Any]) -> str:
+    """Представление поста в промпте"""
+    post_content = f"Title: {post['title']}\nText: {post['text']}\n"
+    post_content += f"Score: {post['score']}, "
+    post_content += f"Comments: {post['num_comments']}\n"
+    if post.get("comments"):
+        post_content += "Top comments:\n"
+        post_content += format_comments(post["comments"], settings.ANALYSIS_COMMENT_TOKENS_PER_POST) + "\n"
+    post_content += "---\n"
+    return post_content
+
+def chunk_posts(posts: List[Dict[str, Any]], token_budget: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split posts into consecutive chunks whose prompts fit the token budget.
+
+    A single post larger than the budget gets a chunk of its own.
+    """
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = 0
+    for post in posts:
+        tokens = count_tokens(format_post(post))
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(post)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _engagement_weight(posts: List[Dict[str, Any]]) -> float:
+    return float(sum(max(post["score"], 0) + max(post["num_comments"], 0) + 1 for post in posts))
+
+def reduce_analyses(partials: List[tuple[float, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk analyses into one.
+
+    Sentiment labels are mapped to -1/0/1 and averaged with the chunk
+    weights, toxicity is the weighted mean of the chunk levels.
+    """
+    total_weight = sum(weight for weight, _ in partials)
+    sentiment = sum(
+        weight * SENTIMENT_VALUES.get(str(partial["overall_sentiment"]).lower(), 0.0)
+        for weight, partial in partials
+    ) / total_weight
+    toxicity = sum(weight * partial["toxicity_level"] for weight, partial in partials) / total_weight
+
+    if sentiment > 1 / 3:
+        overall_sentiment = "positive"
+    elif sentiment < -1 / 3:
+        overall_sentiment = "negative"
+    else:
+        overall_sentiment = "neutral"
+
+    return {
+        "overall_sentiment": overall_sentiment,
+        "toxicity_level": round(toxicity, 3),
+    }
+
+async def analyze_posts(
+    posts: List[Dict[str, Any]],
+    corpus: Optional[BackgroundCorpus] = None,
+    prompt_posts: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze Reddit posts to generate insights.
+
+    Frequent words, influential accounts and engagement-weighted per-post
+    lexicon scores are computed locally from the posts; only sentiment and
+    toxicity are requested from OpenAI, and the lexicon scores stand in for
+    them if every request fails. The posts
+    are cleaned and cut to ANALYSIS_PROMPT_TOKEN_BUDGET (services/prompt_builder.py),
+    then split into token-budgeted chunks that are analyzed in parallel (at most
+    ANALYSIS_MAX_CONCURRENCY requests at once) and merged by reduce_analyses.
+    Each chunk is memoized by the content of its posts, so an identical set
+    of posts does not trigger a new request.
     
     Args:
         posts: List of Reddit posts with their metadata
+        corpus: Background corpus used for TF-IDF keyword ranking
+        prompt_posts: Posts sent to OpenAI, if not all of posts (e.g. the
+            near-duplicate cluster representatives); the local statistics
+            are always computed from posts
         
     Returns:
-        Dictionary containing analysis results including sentiment, toxicity, etc.
+        Dictionary containing analysis results including sentiment, toxicity, etc.,
+        and token_usage with the OpenAI tokens actually spent
     """
+    with span("stats"):
+        statistics = compute_post_statistics(posts, corpus)
+        if any("sentiment_score" not in post for post in posts):
+            score_posts(posts)
+        local_scores = aggregate_scores(posts)
+
+    with span("prompt"):
+        prompt_posts = compact_posts(
+            posts if prompt_posts is None else prompt_posts,
+            settings.ANALYSIS_PROMPT_TOKEN_BUDGET,
+            settings.ANALYSIS_MIN_POST_TOKENS,
+            overhead=lambda post: count_tokens(format_post(post)),
+        )
+        chunks = chunk_posts(prompt_posts, settings.ANALYSIS_CHUNK_TOKENS)
+    logger.debug(
+        f"Analyzing {len(prompt_posts)} of {len(posts)} posts in {len(chunks)} chunks"
+    )
+    semaphore = asyncio.Semaphore(settings.ANALYSIS_MAX_CONCURRENCY)
+    results = await asyncio.gather(*(_analyze_chunk(chunk, semaphore) for chunk in chunks))
+
+    token_usage = {
+        "prompt_tokens": sum(usage.get("prompt_tokens", 0) for _, usage in results),
+        "completion_tokens": sum(usage.get("completion_tokens", 0) for _, usage in results),
+        "requests": sum(1 for _, usage in results if usage),
+        "prompt_budget": settings.ANALYSIS_PROMPT_TOKEN_BUDGET,
+        "posts_in_prompt": len(prompt_posts),
+    }
+    partials = [
+        (_engagement_weight(chunk), result)
+        for chunk, (result, _) in zip(chunks, results)
+        if result is not None
+    ]
+    if partials:
+        return {
+            **reduce_analyses(partials),
+            **statistics,
+            **local_scores,
+            "analysis_source": "llm",
+            "token_usage": token_usage,
+        }
+
+    # Fall back to the local per-post scores if no chunk could be analyzed
+    return {
+        "overall_sentiment": sentiment_label(local_scores["post_sentiment"]),
+        "toxicity_level": local_scores["post_toxicity"],
+        **statistics,
+        **local_scores,
+        "analysis_source": "lexicon",
+        "token_usage": token_usage,
+    }
+
+async def _analyze_chunk(
+    posts: List[Dict[str, Any]],
+    semaphore: asyncio.Semaphore,
+) -> tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+    """Analysis of one chunk and the tokens spent on it (none for a memoized chunk)"""
+    key = posts_fingerprint(posts)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        logger.debug(f"Analysis cache hit for {key[:12]}")
+        return cached, {}
+
+    async with semaphore:
+        analysis_result, usage = await _request_analysis(posts)
+    if analysis_result is not None:
+        analysis_cache.set(key, analysis_result)
+    return analysis_result, usage
+
+async def _create_completion(messages: List[Dict[str, str]], timeout: float):
+    started = time.monotonic()
+    response = await client.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=messages,
+        temperature=0.5,
+        max_tokens=1000,
+        response_format={"type": "json_object"},
+        timeout=timeout,
+    )
+    completion_latency.observe(time.monotonic() - started)
+    return response
+
+async def _hedged(messages: List[Dict[str, str]], timeout: float, delay: float):
+    """Send a second request if the first one has not answered after delay; first answer wins"""
+    attempts = {asyncio.create_task(_create_completion(messages, timeout)): "primary"}
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done:
+            attempts[asyncio.create_task(_create_completion(messages, timeout))] = "hedge"
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if len(attempts) > 1:
+                        OPENAI_HEDGES.inc(winner=attempts[task])
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in attempts:
+            task.cancel()
+
+async def _complete(messages: List[Dict[str, str]]):
+    """
+    Chat completion within the request deadline.
+
+    The timeout is cut to what is left of the deadline (services/deadline.py);
+    returns None if nothing is left. With OPENAI_HEDGE_ENABLED a second
+    request is sent once the first one is slower than the recent
+    OPENAI_HEDGE_PERCENTILE latency.
+    """
+    timeout = settings.OPENAI_TIMEOUT_SECONDS
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            logger.warning("Request deadline exceeded before the OpenAI call")
+            return None
+        timeout = min(timeout, left)
+
+    delay = completion_latency.percentile(settings.OPENAI_HEDGE_PERCENTILE)
+    if not settings.OPENAI_HEDGE_ENABLED or delay is None:
+        return await asyncio.wait_for(_create_completion(messages, timeout), timeout)
+    delay = max(delay, settings.OPENAI_HEDGE_MIN_DELAY_SECONDS)
+    if delay >= timeout:
+        return await asyncio.wait_for(_create_completion(messages, timeout), timeout)
+    return await asyncio.wait_for(_hedged(messages, timeout, delay), timeout)
+
+async def _request_analysis(
+    posts: List[Dict[str, Any]],
+) -> tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+    """Call OpenAI API for the posts; the analysis is None if it failed"""
+    usage: Dict[str, int] = {}
     try:
         # Prepare posts data for analysis
-        logger.debug("Starting to prepare posts data for analysis")
-        posts_text = []
-        for post in posts:
-            post_content = f"Title: {post['title']}\nText: {post['text']}\n"
-            post_content += f"Author: {post['author']}, Score: {post['score']}, "
-            post_content += f"Comments: {post['num_comments']}\n---\n"
-            posts_text.append(post_content)
-        logger.debug(f"Prepared {len(posts_text)} posts for analysis")
+        posts_text = [format_post(post) for post in posts]
 
         # Create analysis prompt
-        logger.debug("Creating analysis prompt")
         prompt = f"""Analyze the following Reddit posts and provide insights in JSON format.
         Posts to analyze:
-        {''.join(posts_text[:20])}  # Limit to first 20 posts for API context length
+        {''.join(posts_text)}
 
         Please provide analysis in the following JSON format:
         {{
             "overall_sentiment": "positive/negative/neutral",
-            "toxicity_level": 0.0-1.0,
-            "frequent_words": ["word1", "word2", "word3", ...],
-            "influential_accounts": ["user1", "user2", "user3", ...]
+            "toxicity_level": 0.0-1.0
         }}
 
         Focus on:
         1. Overall sentiment of the discussion
         2. Toxicity level as a decimal between 0 and 1
-        3. Most frequently used meaningful words (exclude common words)
-        4. Top 5 most influential accounts based on engagement
         
         Return ONLY the JSON response without any additional text.
         """
 
         # Call OpenAI API
-        logger.debug("Calling OpenAI API")
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an AI trained to analyze Reddit posts and provide insights in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=1000,
-            response_format={"type": "json_object"}
-        )
-        logger.debug("Received response from OpenAI API")
+        messages = [
+            {"role": "system", "content": "You are an AI trained to analyze Reddit posts and provide insights in JSON format."},
+            {"role": "user", "content": prompt}
+        ]
+        with span("openai"):
+            response = await _complete(messages)
+        if response is None:
+            return None, usage
+
+        if response.usage is not None:
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+            }
+            OPENAI_TOKENS.inc(response.usage.prompt_tokens, kind="prompt")
+            OPENAI_TOKENS.inc(response.usage.completion_tokens, kind="completion")
 
         # Parse the response
         analysis_text = response.choices[0].message.content.strip()
-        logger.debug(f"Analysis text: {analysis_text}")
         analysis_result = json.loads(analysis_text)
 
         # Validate and clean up the response
-        logger.debug("Validating and cleaning up the response")
-        required_keys = ["overall_sentiment", "toxicity_level", "frequent_words", "influential_accounts"]
-        for key in required_keys:
-            if key not in analysis_result:
-                analysis_result[key] = [] if key in ["frequent_words", "influential_accounts"] else "neutral" if key == "overall_sentiment" else 0.0
-
-        # Ensure toxicity is within bounds
-        analysis_result["toxicity_level"] = max(0.0, min(1.0, float(analysis_result["toxicity_level"])))
-
-        # Limit arrays to reasonable sizes
-        analysis_result["frequent_words"] = analysis_result["frequent_words"][:10]
-        analysis_result["influential_accounts"] = analysis_result["influential_accounts"][:5]
+        analysis_result = {
+            "overall_sentiment": analysis_result.get("overall_sentiment", "neutral"),
+            # Ensure toxicity is within bounds
+            "toxicity_level": max(0.0, min(1.0, float(analysis_result.get("toxicity_level", 0.0)))),
+        }
         logger.debug(f"Analysis result: {analysis_result}")
 
-        logger.debug("Successfully analyzed Reddit posts")
-        return analysis_result
+        return analysis_result, usage
 
     except Exception as e:
         logger.error(f"Error analyzing posts: {str(e)}")
-        # Return a safe default response in case of error
-        return {
-            "overall_sentiment": "neutral",
-            "toxicity_level": 0.0,
-            "frequent_words": [],
-            "influential_accounts": []
-        }
\ No newline at end of file
+        return None, usage
\ No newline at end of file
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from backend.config import settings
+from backend.services.deadline import (
+    DEADLINE_GRACE_SECONDS,
+    SharedDeadline,
+    current_deadline,
+    remaining,
+    shared_deadline,
+)
+from backend.services.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-entry time to live.
+
+    Not thread-safe: it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def discard_if(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches the predicate"""
+        keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class InMemoryBackend:
+    """Stand-in for the Redis tier (tests and single-process deployments)."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def close(self) -> None:
+        self._data.clear()
+
+
+class RedisBackend:
+    """Shared cache tier stored in Redis."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._redis.set(key, value, ex=max(1, int(ttl)))
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+def make_search_key(
+    topic: str,
+    limit: Optional[int],
+    subreddits: Iterable[str],
+    sorts: Iterable[str],
+    time_filters: Iterable[str],
+    include_comments: bool = False,
+) -> str:
+    """Нормализованный ключ кэша для поискового запроса"""
+    normalized_topic = " ".join(topic.lower().split())
+    return json.dumps([
+        normalized_topic,
+        limit,
+        sorted({subreddit.lower() for subreddit in subreddits}),
+        sorted({sort.lower() for sort in sorts}),
+        sorted({time_filter.lower() for time_filter in time_filters}),
+        include_comments,
+    ])
+
+
+class SearchResultCache:
+    """
+    Two-tier cache for search results with single-flight semantics.
+
+    Concurrent callers asking for the same key share one computation,
+    which runs in a task of its own and is awaited by all of them.
+    """
+
+    def __init__(self, local: TTLCache, remote=None, namespace: str = "search"):
+        self.local = local
+        self.remote = remote
+        self.namespace = namespace
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._deadlines: Dict[str, SharedDeadline] = {}
+
+    def _remote_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached value from the local or the shared tier, or None"""
+        value = self.local.get(key)
+        if value is None:
+            value = await self._get_remote(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, value)
+        await self._set_remote(key, value)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Cached value, or the result of factory() shared by concurrent callers.
+
+        The factory runs in a task owned by the cache, under the latest of
+        the callers' deadlines (services/deadline.py), which is extended as
+        callers join. Cancelling a caller, or running out of its deadline,
+        only stops that caller's wait: the computation goes on for the
+        others. A caller waits DEADLINE_GRACE_SECONDS past its deadline for
+        the degraded result of a computation cut at that deadline, then gets
+        asyncio.TimeoutError. A result for which cacheable() is false (e.g.
+        degraded by a deadline) is returned to the waiting callers only.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        expires = current_deadline()
+        task = self._inflight.get(key)
+        if task is None:
+            shared = SharedDeadline(expires)
+            task = asyncio.ensure_future(self._compute(key, factory, shared, cacheable))
+            self._inflight[key] = task
+            self._deadlines[key] = shared
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            logger.debug(f"Joining in-flight search for key {key}")
+            self._deadlines[key].extend(expires)
+        left = remaining()
+        timeout = None if left is None else max(left, 0.0) + DEADLINE_GRACE_SECONDS
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    async def _compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        shared: SharedDeadline,
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]],
+    ) -> Dict[str, Any]:
+        with shared_deadline(shared):
+            value = await self._get_remote(key)
+            if value is not None:
+                self.local.set(key, value)
+                return value
+            value = await factory()
+            if cacheable is not None and not cacheable(value):
+                return value
+            await self._set_remote(key, value)
+        self.local.set(key, value)
+        return value
+
+    def _finished(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._deadlines[key]
+        # Every caller may have stopped waiting: retrieve the exception so it
+        # is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _get_remote(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.remote is None:
+            return None
+        try:
+            raw = await self.remote.get(self._remote_key(key))
+        except Exception as e:
+            logger.error(f"Error reading from search cache: {str(e)}")
+            return None
+        return loads(raw) if raw is not None else None
+
+    async def _set_remote(self, key: str, value: Dict[str, Any]) -> None:
+        if self.remote is None:
+            return
+        try:
+            await self.remote.set(self._remote_key(key), dumps(value), self.local.ttl)
+        except Exception as e:
+            logger.error(f"Error writing to search cache: {str(e)}")
+
+    async def close(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.remote is not None:
+            await self.remote.close()
+
+
+def create_search_cache() -> SearchResultCache:
+    """Создание кэша результатов поиска по настройкам"""
+    remote = RedisBackend(settings.REDIS_URL) if settings.REDIS_URL else None
+    return SearchResultCache(
+        local=TTLCache(
+            maxsize=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+        ),
+        remote=remote,
+    )
+
+
+search_cache = create_search_cache()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+from backend.services.cache import TTLCache
+from backend.services.deadline import bounded_timeout
+from backend.services.reddit_scheduler import reddit_scheduler, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_BODIES = frozenset({"[deleted]", "[removed]"})
+
+# Top comments per submission id
+comment_cache = TTLCache(
+    maxsize=settings.COMMENTS_CACHE_MAX_ENTRIES,
+    ttl=settings.COMMENTS_CACHE_TTL_SECONDS,
+)
+
+
+async def fetch_top_comments(
+    reddit,
+    post_id: str,
+    top_n: int,
+    replace_more_limit: int,
+    max_depth: int,
+) -> List[str]:
+    """Bodies of the top-scored comments of a submission, up to max_depth"""
+    submission = await reddit.submission(id=post_id, fetch=False)
+    submission.comment_sort = "top"
+    submission.comment_limit = top_n
+    await submission.load()
+
+    await submission.comments.replace_more(limit=replace_more_limit)
+    comments = [
+        comment for comment in await submission.comments.list()
+        if getattr(comment, "depth", 0) <= max_depth and comment.body not in SKIPPED_BODIES
+    ]
+    comments.sort(key=lambda comment: comment.score, reverse=True)
+    return [comment.body for comment in comments[:top_n]]
+
+
+async def attach_comments(
+    reddit,
+    posts: List[Dict[str, Any]],
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> None:
+    """
+    Add the top comments of every post as post["comments"].
+
+    Comments are fetched concurrently (COMMENTS_CONCURRENCY at once) and
+    cached per submission. After COMMENTS_DEADLINE_SECONDS, or earlier if
+    the request deadline is closer, the remaining fetches are cancelled and
+    their posts get whatever is cached, or no comments at all.
+    """
+    semaphore = asyncio.Semaphore(settings.COMMENTS_CONCURRENCY)
+    # Each submission costs one request plus one per replace_more call
+    cost = 1 + settings.COMMENTS_REPLACE_MORE_LIMIT
+
+    async def fetch(post_id: str) -> None:
+        async with semaphore:
+            async with reddit_scheduler.acquire(user_id, priority, cost):
+                comments = await fetch_top_comments(
+                    reddit,
+                    post_id,
+                    settings.COMMENTS_PER_POST,
+                    settings.COMMENTS_REPLACE_MORE_LIMIT,
+                    settings.COMMENTS_MAX_DEPTH,
+                )
+        comment_cache.set(post_id, comments)
+
+    missing = list(dict.fromkeys(
+        post["id"] for post in posts if comment_cache.get(post["id"]) is None
+    ))
+    tasks = [asyncio.create_task(fetch(post_id)) for post_id in missing]
+    if tasks:
+        done, pending = await asyncio.wait(
+            tasks, timeout=max(0.0, bounded_timeout(settings.COMMENTS_DEADLINE_SECONDS))
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        failed = [task for task in done if task.exception() is not None]
+        if pending or failed:
+            logger.warning(
+                f"Comments for {len(pending)} posts timed out and {len(failed)} failed; "
+                "continuing without them"
+            )
+
+    for post in posts:
+        post["comments"] = comment_cache.get(post["id"]) or []
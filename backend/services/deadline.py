@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Union
+
+# Time a caller waits past its deadline for a degraded answer (e.g. the
+# lexicon analysis once the OpenAI call was cut at the deadline)
+DEADLINE_GRACE_SECONDS = 1.0
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline ran out before even a degraded answer was ready"""
+
+
+class SharedDeadline:
+    """
+    Deadline of work shared by several requests.
+
+    It is the latest of the callers' deadlines and grows as callers join;
+    None (no deadline) once any caller has none.
+    """
+
+    __slots__ = ("expires",)
+
+    def __init__(self, expires: Optional[float]):
+        self.expires = expires
+
+    def extend(self, expires: Optional[float]) -> None:
+        if self.expires is not None:
+            self.expires = None if expires is None else max(self.expires, expires)
+
+
+# Absolute time.monotonic() by which the current request must be answered,
+# or the SharedDeadline of shared work
+_deadline: ContextVar[Union[float, SharedDeadline, None]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[float]:
+    """Absolute time.monotonic() of the current deadline, or None"""
+    expires = _deadline.get()
+    if isinstance(expires, SharedDeadline):
+        return expires.expires
+    return expires
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Set a deadline for the code inside the block.
+
+    The deadline follows the context into awaited calls and tasks created
+    inside the block. A nested deadline can only shorten the outer one.
+    """
+    if seconds is None or seconds <= 0:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = current_deadline()
+    if current is not None:
+        expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def shared_deadline(shared: SharedDeadline) -> Iterator[None]:
+    """Run the code inside the block under a deadline that may still be extended"""
+    token = _deadline.set(shared)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline (may be negative), or None without one"""
+    expires = current_deadline()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def bounded_timeout(timeout: float) -> float:
+    """timeout, shortened to what is left of the current deadline"""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
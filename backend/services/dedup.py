@@ -0,0 +1,125 @@
+import logging
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+from backend.config import settings
+from backend.services.text_stats import post_document, tokenize
+
+logger = logging.getLogger(__name__)
+
+HASH_MASK = np.uint64(0xFFFFFFFF)
+EMPTY_SIGNATURE = np.uint64(0xFFFFFFFF)
+
+
+def shingles(post: Dict[str, Any], size: int) -> List[str]:
+    """Word shingles of title + text (stopwords removed, so rewordings still overlap)"""
+    tokens = tokenize(post_document(post))
+    if len(tokens) < size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def _permutations(num_perm: int) -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: the same batch always gives the same clusters
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, 2 ** 32, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 32, size=(num_perm, 1), dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(posts: List[Dict[str, Any]], num_perm: int, shingle_size: int) -> np.ndarray:
+    """(posts x num_perm) MinHash signatures; posts without shingles get an all-max row"""
+    a, b = _permutations(num_perm)
+    signatures = np.full((len(posts), num_perm), EMPTY_SIGNATURE, dtype=np.uint64)
+    for row, post in enumerate(posts):
+        hashes = np.fromiter(
+            {zlib.crc32(shingle.encode()) for shingle in shingles(post, shingle_size)},
+            dtype=np.uint64,
+        )
+        if hashes.size:
+            # (a * h + b) mod 2^32 for every permutation and shingle at once
+            signatures[row] = ((a * hashes + b) & HASH_MASK).min(axis=1)
+    return signatures
+
+
+def cluster_labels(
+    signatures: np.ndarray,
+    bands: int,
+    threshold: float,
+) -> List[int]:
+    """
+    Cluster label of every row (the index of its first member).
+
+    Rows sharing an LSH band bucket are candidates; a candidate is merged
+    when the signatures agree on at least threshold of their positions
+    (the estimated Jaccard similarity). Linear in the number of rows.
+    """
+    count, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    parent = list(range(count))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    empty = (signatures == EMPTY_SIGNATURE).all(axis=1)
+    for band in range(bands):
+        buckets: Dict[bytes, int] = {}
+        band_slice = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for row in range(count):
+            if empty[row]:
+                continue
+            first = buckets.setdefault(band_slice[row].tobytes(), row)
+            if first == row:
+                continue
+            root_row, root_first = find(row), find(first)
+            if root_row == root_first:
+                continue
+            similarity = float((signatures[row] == signatures[first]).mean())
+            if similarity >= threshold:
+                parent[max(root_row, root_first)] = min(root_row, root_first)
+    return [find(row) for row in range(count)]
+
+
+def collapse_near_duplicates(posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse crossposts and reworded copies of the same story.
+
+    Every post in posts gets cluster_size and duplicate_of (the id of the
+    cluster representative, None for the representative itself). Returns
+    the representatives (the highest-scored post of each cluster) as
+    copies whose score and num_comments are summed over the cluster.
+    """
+    if not posts:
+        return []
+    if not settings.DEDUP_ENABLED or len(posts) < 2:
+        for post in posts:
+            post["cluster_size"], post["duplicate_of"] = 1, None
+        return list(posts)
+
+    signatures = minhash_signatures(posts, settings.DEDUP_NUM_PERM, settings.DEDUP_SHINGLE_SIZE)
+    labels = cluster_labels(signatures, settings.DEDUP_BANDS, settings.DEDUP_THRESHOLD)
+
+    clusters: Dict[int, List[Dict[str, Any]]] = {}
+    for label, post in zip(labels, posts):
+        clusters.setdefault(label, []).append(post)
+
+    representatives = []
+    for members in clusters.values():
+        representative = max(members, key=lambda post: post["score"])
+        for post in members:
+            post["cluster_size"] = len(members)
+            post["duplicate_of"] = None if post is representative else representative["id"]
+        representatives.append({
+            **representative,
+            "score": sum(post["score"] for post in members),
+            "num_comments": sum(post["num_comments"] for post in members),
+        })
+
+    if len(representatives) < len(posts):
+        logger.debug(f"Collapsed {len(posts)} posts into {len(representatives)} clusters")
+    return representatives
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from backend.config import settings
+from backend.services.metrics import EXECUTOR_WAIT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """
+    Shared thread pool for blocking work.
+
+    run() executes a callable in the pool, which keeps the event loop free
+    while the work runs (bcrypt releases the GIL), and records queue-depth
+    metrics and the wait for a worker (executor_wait_seconds histogram).
+    """
+
+    def __init__(self, threads: int):
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="blocking")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _started(self, submitted_at: float) -> None:
+        wait = time.perf_counter() - submitted_at
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        EXECUTOR_WAIT.observe(wait)
+
+    def _finished(self) -> None:
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def call() -> T:
+            self._started(submitted_at)
+            try:
+                return func(*args)
+            finally:
+                self._finished()
+
+        return await asyncio.get_running_loop().run_in_executor(self._threads, call)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait_seconds": self.max_wait,
+            }
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+executor = BlockingExecutor(settings.EXECUTOR_THREADS)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """Выполнение блокирующей функции в общем пуле потоков"""
+    return await executor.run(func, *args)
+
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_try_advisory_lock, so only one process runs maintenance
+MAINTENANCE_LOCK_ID = 724611
+
+PARTITION_NAME_RE = re.compile(r"^search_history_y(\d{4})m(\d{2})$")
+
+# DDL on search_history gives up instead of queueing every history query
+# behind it while it waits for a long-running reader; retried next pass
+SET_LOCK_TIMEOUT = text("SET LOCAL lock_timeout = '5s'")
+
+# One batch of compaction: the next batch_size old entries by id
+COMPACT_BATCH = text("""
+    WITH batch AS (
+        SELECT id, created_at
+        FROM search_history
+        WHERE created_at < :cutoff
+          AND id > :after_id
+          AND (results ->> 'compacted') IS NULL
+        ORDER BY id
+        LIMIT :batch_size
+    )
+    UPDATE search_history
+    SET results = json_build_object(
+        'analysis', search_history.results -> 'analysis',
+        'post_count', COALESCE(
+            json_array_length(search_history.results -> 'post_ids'),
+            json_array_length(search_history.results -> 'posts'),
+            0
+        ),
+        'compacted', true
+    )
+    FROM batch
+    WHERE search_history.id = batch.id AND search_history.created_at = batch.created_at
+    RETURNING search_history.id
+""")
+
+# One batch of expired rows of the default partition, with their links;
+# monthly partitions are dropped whole by apply_retention
+EXPIRE_DEFAULT_BATCH = """
+    WITH batch AS (
+        SELECT id FROM search_history_default
+        WHERE created_at < CAST(:cutoff AS date)
+        ORDER BY id
+        LIMIT :batch_size
+    ), links AS (
+        DELETE FROM search_history_posts WHERE history_id IN (SELECT id FROM batch)
+    ), expired AS (
+        DELETE FROM search_history_default
+        WHERE id IN (SELECT id FROM batch)
+        RETURNING *
+    )
+    {action}
+"""
+DELETE_DEFAULT_BATCH = text(EXPIRE_DEFAULT_BATCH.format(action="SELECT id FROM expired"))
+ARCHIVE_DEFAULT_BATCH = text(EXPIRE_DEFAULT_BATCH.format(
+    action="INSERT INTO search_history_archive_default SELECT * FROM expired RETURNING id"
+))
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def ensure_partitions(connection, months_ahead: int) -> None:
+    """
+    Create monthly partitions from the current month up to months_ahead.
+
+    Every month is created in its own short transaction. Rows of the month
+    that already landed in search_history_default are moved into the new
+    partition (see create_search_history_partition); a month that cannot be
+    created is logged and retried on the next pass. Returns the months that
+    failed.
+    """
+    current = date.today().replace(day=1)
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        try:
+            await connection.execute(SET_LOCK_TIMEOUT)
+            await connection.execute(
+                text("SELECT create_search_history_partition(:month)"), {"month": month}
+            )
+            await connection.commit()
+        except Exception as e:
+            await connection.rollback()
+            logger.error(f"Error creating search history partition for {month:%Y-%m}: {str(e)}")
+
+
+async def list_partitions(connection) -> List[tuple[str, date]]:
+    """Monthly partitions of search_history with the month they hold"""
+    result = await connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'search_history'
+    """))
+    partitions = []
+    for (name,) in result.all():
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def apply_retention(connection, retention_months: int, archive: bool) -> List[str]:
+    """
+    Drop (or detach, if archive is set) partitions older than retention_months.
+
+    Detached partitions are renamed to search_history_archive_yYYYYmMM and
+    stay in the database as plain tables. The links of a partition are
+    deleted first; DETACH takes an ACCESS EXCLUSIVE lock on search_history,
+    so it runs in a transaction of its own that commits right away.
+    """
+    if retention_months <= 0:
+        return []
+
+    oldest_kept = add_months(date.today().replace(day=1), -retention_months)
+    expired = []
+    for name, month in await list_partitions(connection):
+        if month >= oldest_kept:
+            continue
+        try:
+            await connection.execute(text(
+                f'DELETE FROM search_history_posts WHERE history_id IN (SELECT id FROM "{name}")'
+            ))
+            await connection.commit()
+
+            await connection.execute(SET_LOCK_TIMEOUT)
+            await connection.execute(text(f'ALTER TABLE search_history DETACH PARTITION "{name}"'))
+            if archive:
+                archive_name = name.replace("search_history_", "search_history_archive_", 1)
+                await connection.execute(text(f'ALTER TABLE "{name}" RENAME TO "{archive_name}"'))
+            else:
+                await connection.execute(text(f'DROP TABLE "{name}"'))
+            await connection.commit()
+        except Exception as e:
+            await connection.rollback()
+            logger.error(f"Error expiring search history partition {name}: {str(e)}")
+            continue
+        expired.append(name)
+    return expired
+
+
+async def expire_default_rows(
+    connection, retention_months: int, archive: bool, batch_size: int
+) -> int:
+    """
+    Delete (or archive) rows older than retention_months from search_history_default.
+
+    Rows land in the default partition when their month had no partition
+    yet; apply_retention never sees them. Archived rows are moved into the
+    plain table search_history_archive_default. Rows and their links go in
+    batches of batch_size, one short transaction per batch. Returns the
+    number of expired rows.
+    """
+    if retention_months <= 0:
+        return 0
+
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    if archive:
+        await connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_history_archive_default (LIKE search_history)"
+        ))
+        await connection.commit()
+
+    statement = ARCHIVE_DEFAULT_BATCH if archive else DELETE_DEFAULT_BATCH
+    expired = 0
+    while True:
+        ids = (await connection.execute(statement, {
+            "cutoff": cutoff,
+            "batch_size": batch_size,
+        })).scalars().all()
+        await connection.commit()
+        if not ids:
+            return expired
+        expired += len(ids)
+
+
+async def compact_history(connection, older_than_days: int, batch_size: int) -> int:
+    """
+    Shrink results of old entries down to their analysis summary.
+
+    The links to the stored posts are removed; the number of posts is kept
+    in results as post_count. Entries are compacted in batches of batch_size
+    ids, one short transaction per batch. Returns the number of compacted
+    entries.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    compacted = 0
+    after_id = 0
+    while True:
+        ids = (await connection.execute(COMPACT_BATCH, {
+            "cutoff": cutoff,
+            "after_id": after_id,
+            "batch_size": batch_size,
+        })).scalars().all()
+        if not ids:
+            await connection.commit()
+            return compacted
+        await connection.execute(
+            text("DELETE FROM search_history_posts WHERE history_id = ANY(:ids)"), {"ids": ids}
+        )
+        await connection.commit()
+        compacted += len(ids)
+        after_id = max(ids)
+
+
+async def run_maintenance() -> None:
+    """
+    One maintenance pass: partitions, retention and compaction.
+
+    Every step commits its own short transactions, so history reads and
+    writes are never blocked for the whole pass. A session-level advisory
+    lock on a dedicated connection keeps other processes out meanwhile.
+    """
+    async with engine.connect() as connection:
+        locked = (await connection.execute(
+            text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": MAINTENANCE_LOCK_ID}
+        )).scalar()
+        await connection.commit()
+        if not locked:
+            logger.debug("History maintenance is running in another process")
+            return
+
+        try:
+            await ensure_partitions(connection, settings.HISTORY_PARTITIONS_AHEAD)
+            expired = await apply_retention(
+                connection, settings.HISTORY_RETENTION_MONTHS, settings.HISTORY_ARCHIVE_EXPIRED
+            )
+            expired_rows = await expire_default_rows(
+                connection,
+                settings.HISTORY_RETENTION_MONTHS,
+                settings.HISTORY_ARCHIVE_EXPIRED,
+                settings.HISTORY_COMPACT_BATCH_SIZE,
+            )
+            compacted = await compact_history(
+                connection, settings.HISTORY_COMPACT_AFTER_DAYS, settings.HISTORY_COMPACT_BATCH_SIZE
+            )
+        finally:
+            await connection.rollback()
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MAINTENANCE_LOCK_ID}
+            )
+            await connection.commit()
+
+    if expired:
+        logger.info(f"Expired search history partitions: {', '.join(expired)}")
+    if expired_rows:
+        logger.info(f"Expired {expired_rows} search history entries from the default partition")
+    if compacted:
+        logger.info(f"Compacted {compacted} search history entries")
+
+
+async def maintenance_loop() -> None:
+    """Background task running run_maintenance every HISTORY_MAINTENANCE_INTERVAL_SECONDS"""
+    while True:
+        try:
+            await run_maintenance()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in search history maintenance: {str(e)}")
+        await asyncio.sleep(settings.HISTORY_MAINTENANCE_INTERVAL_SECONDS)
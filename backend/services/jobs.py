@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+from backend.database import AsyncSessionLocal
+from backend.models.search import SearchRequest
+from backend.services.serialization import dumps, loads
+from backend.services.reddit_scheduler import PRIORITY_BACKGROUND
+from backend.services.search_service import run_search, save_search_history
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class InProcessJobBackend:
+    """Job queue and job records kept in the memory of the current process"""
+
+    def __init__(self, result_ttl: float):
+        self.result_ttl = result_ttl
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._jobs: Dict[str, tuple[float, Dict[str, Any]]] = {}
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, (expires_at, _) in self._jobs.items() if expires_at <= now]:
+            del self._jobs[job_id]
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        self._evict_expired()
+        self._jobs[job["id"]] = (time.monotonic() + self.result_ttl, job)
+        await self._queue.put(job["id"])
+
+    async def dequeue(self) -> Optional[Dict[str, Any]]:
+        job_id = await self._queue.get()
+        return await self.get(job_id)
+
+    async def ack(self, job_id: str) -> None:
+        pass
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        entry = self._jobs.get(job_id)
+        if entry is not None:
+            entry[1].update(fields, updated_at=time.time())
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisJobBackend:
+    """
+    Job queue in a Redis list, shared by all processes using the same Redis.
+
+    Delivery is at least once: dequeue moves the job id into a processing
+    list (BLMOVE) and ack removes it when the job is finished. A job whose
+    worker died stays there; once it has not been updated for lease
+    seconds, a worker of any process puts it back in the queue (checked
+    every lease / 2 seconds and on startup).
+    """
+
+    def __init__(self, url: str, result_ttl: float, lease: float, namespace: str = "jobs"):
+        import redis.asyncio as redis
+
+        self.result_ttl = result_ttl
+        self.lease = lease
+        self.namespace = namespace
+        self._redis = redis.from_url(url)
+        self._next_recovery = 0.0
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.namespace}:job:{job_id}"
+
+    @property
+    def _queue_key(self) -> str:
+        return f"{self.namespace}:queue"
+
+    @property
+    def _processing_key(self) -> str:
+        return f"{self.namespace}:processing"
+
+    async def _save(self, job: Dict[str, Any]) -> None:
+        raw = dumps(job)
+        await self._redis.set(self._job_key(job["id"]), raw, ex=int(self.result_ttl))
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        await self._save(job)
+        await self._redis.lpush(self._queue_key, job["id"])
+
+    async def dequeue(self) -> Optional[Dict[str, Any]]:
+        if time.monotonic() >= self._next_recovery:
+            self._next_recovery = time.monotonic() + self.lease / 2
+            await self.requeue_stale()
+        # Returns None now and then, so the check above runs on an idle queue too
+        job_id = await self._redis.blmove(
+            self._queue_key, self._processing_key, max(int(self.lease / 2), 1), src="RIGHT", dest="LEFT"
+        )
+        if job_id is None:
+            return None
+        job = await self.get(job_id.decode())
+        if job is None:
+            await self.ack(job_id.decode())
+        return job
+
+    async def ack(self, job_id: str) -> None:
+        await self._redis.lrem(self._processing_key, 0, job_id)
+
+    async def requeue_stale(self) -> int:
+        """Put jobs of dead workers (not updated for lease seconds) back in the queue"""
+        stale_before = time.time() - self.lease
+        requeued = 0
+        for raw_id in await self._redis.lrange(self._processing_key, 0, -1):
+            job_id = raw_id.decode()
+            job = await self.get(job_id)
+            if job is not None and job["status"] not in (JOB_PENDING, JOB_RUNNING):
+                await self.ack(job_id)
+                continue
+            if job is not None and job["updated_at"] > stale_before:
+                continue
+            # LREM is atomic: only one process re-queues a given job
+            if await self._redis.lrem(self._processing_key, 1, job_id) and job is not None:
+                await self.update(job_id, status=JOB_PENDING)
+                await self._redis.lpush(self._queue_key, job_id)
+                requeued += 1
+        if requeued:
+            logger.warning(f"Re-queued {requeued} search jobs left by stopped workers")
+        return requeued
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self._job_key(job_id))
+        return loads(raw) if raw is not None else None
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        job = await self.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+            await self._save(job)
+
+    def queue_depth(self) -> int:
+        # Not tracked locally: the queue is shared between processes
+        return 0
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+class SearchJobManager:
+    """
+    Runs searches in the background.
+
+    A fixed pool of worker tasks takes jobs from the backend queue and runs
+    the fetch/analyze/persist pipeline, so the number of workers bounds the
+    upstream work running at once.
+    """
+
+    def __init__(self, backend, concurrency: int):
+        self.backend = backend
+        self.concurrency = concurrency
+        self._workers: List[asyncio.Task] = []
+
+    async def submit(self, user_id: int, request: SearchRequest) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": JOB_PENDING,
+            "request": request.dict(),
+            "result": None,
+            "history_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.backend.enqueue(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.backend.get(job_id)
+
+    def start(self, reddit) -> None:
+        self._workers = [
+            asyncio.create_task(self._worker(reddit), name=f"search-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} search workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.backend.close()
+
+    async def _worker(self, reddit) -> None:
+        while True:
+            try:
+                job = await self.backend.dequeue()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading search job queue: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if job is not None:
+                await self._run(reddit, job)
+
+    async def _run(self, reddit, job: Dict[str, Any]) -> None:
+        await self.backend.update(job["id"], status=JOB_RUNNING)
+        try:
+            request = SearchRequest(**job["request"])
+            result = await run_search(reddit, request, job["user_id"], PRIORITY_BACKGROUND)
+            async with AsyncSessionLocal() as session:
+                history = await save_search_history(session, job["user_id"], request.topic, result)
+            await self.backend.update(job["id"], status=JOB_DONE, result=result, history_id=history.id)
+        except asyncio.CancelledError:
+            await self.backend.update(job["id"], status=JOB_FAILED, error="Cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Error in search job {job['id']}: {str(e)}")
+            await self.backend.update(job["id"], status=JOB_FAILED, error=str(e))
+        finally:
+            await self.backend.ack(job["id"])
+
+
+def create_job_manager() -> SearchJobManager:
+    """Создание менеджера фоновых поисков по настройкам"""
+    if settings.JOB_BACKEND == "redis" and settings.REDIS_URL:
+        backend = RedisJobBackend(
+            settings.REDIS_URL, settings.JOB_RESULT_TTL_SECONDS, settings.JOB_LEASE_SECONDS
+        )
+    else:
+        if settings.JOB_BACKEND == "redis":
+            logger.warning("JOB_BACKEND=redis without REDIS_URL: search jobs stay in this process")
+        backend = InProcessJobBackend(settings.JOB_RESULT_TTL_SECONDS)
+    return SearchJobManager(backend, settings.JOB_WORKER_CONCURRENCY)
+
+
+search_jobs = create_job_manager()
@@ -0,0 +1,231 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.models.db_models import (
+    RedditPost as DBRedditPost,
+    SearchHistory as DBSearchHistory,
+    SearchHistoryPost as DBSearchHistoryPost,
+)
+from backend.services.timing import span
+from backend.services.trends import record_search_trend
+
+logger = logging.getLogger(__name__)
+
+POST_FIELDS = (
+    "id", "title", "text", "url", "score", "num_comments",
+    "created_utc", "subreddit", "author", "permalink",
+)
+
+# Fields refreshed when an already stored submission is seen again
+MUTABLE_POST_FIELDS = ("title", "text", "score", "num_comments")
+
+# Fields added to the posts by the analysis (scores, clusters, comments)
+ANNOTATION_FIELDS = ("sentiment_score", "toxicity_score", "cluster_size", "duplicate_of", "comments")
+
+# Kept per history entry and post, since reddit_posts only has the latest
+# values of the mutable fields and no annotations
+SNAPSHOT_FIELDS = MUTABLE_POST_FIELDS + ANNOTATION_FIELDS
+
+
+# Rows per INSERT: one bind parameter per field, and asyncpg allows at most
+# 32767 parameters per statement
+UPSERT_BATCH_SIZE = 1000
+
+
+def _unique_posts(posts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    unique = {}
+    for post in posts:
+        unique.setdefault(post["id"], {field: post.get(field) for field in POST_FIELDS})
+    return list(unique.values())
+
+
+async def upsert_posts(session, posts: Iterable[Dict[str, Any]]) -> None:
+    """
+    Insert new submissions into reddit_posts and refresh the stored ones.
+
+    Rows are written in id order, so concurrent saves of overlapping posts
+    lock them in the same order and cannot deadlock, in batches that stay
+    under the bind parameter limit.
+    """
+    rows = sorted(_unique_posts(posts), key=lambda row: row["id"])
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = insert(DBRedditPost).values(rows[start:start + UPSERT_BATCH_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=[DBRedditPost.id],
+            set_={
+                **{field: statement.excluded[field] for field in MUTABLE_POST_FIELDS},
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(statement)
+
+
+# Text search configuration and weights of the history search vector
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+
+def _weighted_vector(content: str, weight: str):
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, content), literal_column(f"'{weight}'"))
+
+
+def history_search_vector(topic: str, result: Dict[str, Any]):
+    """tsvector of a history entry: topic (A), analysis keywords (B), post titles (C)"""
+    words = (result.get("analysis") or {}).get("frequent_words") or []
+    titles = [post.get("title") or "" for post in result.get("posts", [])]
+    vector = _weighted_vector(topic or "", "A")
+    vector = vector.op("||", return_type=TSVECTOR)(_weighted_vector(" ".join(words), "B"))
+    return vector.op("||", return_type=TSVECTOR)(_weighted_vector(" ".join(titles), "C"))
+
+
+def post_snapshot(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Values of a post that belong to the search that returned it"""
+    return {field: post[field] for field in SNAPSHOT_FIELDS if field in post}
+
+
+def compact_results(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored form of a search result: the posts are replaced by their ids"""
+    compact = {key: value for key, value in result.items() if key != "posts"}
+    compact["post_ids"] = [post["id"] for post in result.get("posts", [])]
+    return compact
+
+
+async def save_history(
+    session,
+    user_id: int,
+    topic: str,
+    result: Dict[str, Any],
+    store_posts: bool = True,
+) -> DBSearchHistory:
+    """
+    Save a search result to the user's history.
+
+    Posts go to the shared reddit_posts table; the history row keeps only
+    the analysis and the post ids, plus link rows in result order with the
+    post's snapshot (post_snapshot): its values at search time and its
+    annotations, so the entry reads back as it was returned. With
+    store_posts=False (results that did not come from Reddit, e.g. sent by
+    a client) the posts are kept inline in the history row and the shared
+    tables are left alone. Otherwise the topic's daily trend rollup, shared
+    by every user, is updated in the same transaction.
+    """
+    posts = result.get("posts", [])
+    if store_posts:
+        with span("db_write"):
+            await upsert_posts(session, posts)
+
+    search_history = DBSearchHistory(
+        user_id=user_id,
+        topic=topic,
+        results=compact_results(result) if store_posts else result,
+        search_vector=history_search_vector(topic, result)
+    )
+    session.add(search_history)
+    with span("db_write"):
+        await session.flush()
+
+    seen = set()
+    for position, post in enumerate(posts if store_posts else []):
+        if post["id"] in seen:
+            continue
+        seen.add(post["id"])
+        session.add(DBSearchHistoryPost(
+            history_id=search_history.id,
+            post_id=post["id"],
+            position=position,
+            snapshot=post_snapshot(post),
+        ))
+    if store_posts:
+        with span("db_write"):
+            await record_search_trend(session, topic, result)
+    with span("db_commit"):
+        await session.commit()
+    return search_history
+
+
+def _post_dict(post: DBRedditPost, snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {**{field: getattr(post, field) for field in POST_FIELDS}, **(snapshot or {})}
+
+
+async def load_history_posts(session, history_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Posts of several history entries, loaded in one query"""
+    posts_by_history: Dict[int, List[Dict[str, Any]]] = {history_id: [] for history_id in history_ids}
+    if not history_ids:
+        return posts_by_history
+
+    result = await session.execute(
+        select(DBSearchHistoryPost.history_id, DBSearchHistoryPost.snapshot, DBRedditPost)
+        .join(DBRedditPost, DBRedditPost.id == DBSearchHistoryPost.post_id)
+        .where(DBSearchHistoryPost.history_id.in_(history_ids))
+        .order_by(DBSearchHistoryPost.history_id, DBSearchHistoryPost.position)
+    )
+    for history_id, snapshot, post in result.all():
+        posts_by_history[history_id].append(_post_dict(post, snapshot))
+    return posts_by_history
+
+
+def expand_results(results: Dict[str, Any], posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Public form of stored results: the analysis with the full posts"""
+    results = dict(results or {})
+    post_ids = results.pop("post_ids", None)
+    if post_ids is None:
+        # Entry stored before posts were normalized, or compacted
+        # (services/history_maintenance.py) and left without posts
+        results.setdefault("posts", [])
+        return results
+    return {**results, "posts": posts}
+
+
+# One history entry in its public form, built by Postgres as JSON text; the
+# same shape as hydrate_history, with the posts in result order and their
+# snapshots laid over the reddit_posts fields
+HISTORY_ENTRY_JSON = text(f"""
+    SELECT json_build_object(
+        'id', history.id,
+        'user_id', history.user_id,
+        'topic', history.topic,
+        'results', (history.results::jsonb - 'post_ids') || jsonb_build_object(
+            'posts',
+            CASE WHEN history.results::jsonb ? 'post_ids' THEN COALESCE((
+                SELECT jsonb_agg(
+                    jsonb_build_object({", ".join(f"'{field}', posts.{field}" for field in POST_FIELDS)})
+                        || COALESCE(links.snapshot, '{{}}'::jsonb)
+                    ORDER BY links.position
+                )
+                FROM search_history_posts links
+                JOIN reddit_posts posts ON posts.id = links.post_id
+                WHERE links.history_id = history.id
+            ), '[]'::jsonb)
+            ELSE COALESCE(history.results::jsonb -> 'posts', '[]'::jsonb) END
+        ),
+        'created_at', history.created_at
+    )::text
+    FROM search_history history
+    WHERE history.id = :history_id AND history.user_id = :user_id
+""")
+
+
+async def load_history_json(session, history_id: int, user_id: int) -> Optional[bytes]:
+    """Encoded history entry of the user, or None; nothing is decoded in Python"""
+    raw = (await session.execute(
+        HISTORY_ENTRY_JSON, {"history_id": history_id, "user_id": user_id}
+    )).scalar_one_or_none()
+    return raw.encode() if raw is not None else None
+
+
+async def hydrate_history(session, histories: List[DBSearchHistory]) -> List[Dict[str, Any]]:
+    """History entries with the posts filled back into results"""
+    posts_by_history = await load_history_posts(session, [history.id for history in histories])
+    return [
+        {
+            "id": history.id,
+            "user_id": history.user_id,
+            "topic": history.topic,
+            "results": expand_results(history.results, posts_by_history[history.id]),
+            "created_at": history.created_at,
+        }
+        for history in histories
+    ]
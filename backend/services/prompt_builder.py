@@ -0,0 +1,179 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MODEL = "gpt-4o-mini"
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+CODE_FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
+MARKDOWN_RE = re.compile(r"^\s{0,3}(#{1,6}|>+|[-*+]|\d+\.)\s+|[*_~`]{1,3}|&gt;|&lt;|&amp;|&nbsp;|​", re.MULTILINE)
+# Lines that carry no opinion: edits, thanks, disclaimers, bot footers
+BOILERPLATE_RE = re.compile(
+    r"^\s*(edit\s*\d*\s*:|update\s*:|thanks in advance|thank you in advance|tl;?dr\s*:?\s*$|"
+    r"i am a bot|this action was performed automatically|\[deleted\]|\[removed\]).*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken encoding of the analysis model, or None if tiktoken is unavailable"""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(ANALYSIS_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Not installed, or the encoding files cannot be downloaded
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {str(e)}")
+        return None
+
+
+def load_encoding() -> None:
+    """
+    Load the tiktoken encoding ahead of the first prompt.
+
+    tiktoken downloads the encoding file on first use; this call blocks, so
+    it is run in the executor at startup rather than on the event loop.
+    """
+    _encoding()
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of text for the analysis model"""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Prefix of text with at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text if len(text) <= max_tokens * 4 else text[:max_tokens * 4].rstrip() + "..."
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]).rstrip() + "..."
+
+
+def clean_text(text: Optional[str]) -> str:
+    """Text without URLs, markdown, boilerplate lines and extra whitespace"""
+    if not text:
+        return ""
+    text = CODE_FENCE_RE.sub(" ", text)
+    text = MARKDOWN_LINK_RE.sub(r"\1", text)
+    text = URL_RE.sub(" ", text)
+    text = BOILERPLATE_RE.sub(" ", text)
+    text = MARKDOWN_RE.sub(" ", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _engagement(post: Dict[str, Any]) -> float:
+    return float(max(post.get("score") or 0, 0) + max(post.get("num_comments") or 0, 0) + 1)
+
+
+def allocate_budget(weights: List[float], sizes: List[int], budget: int) -> List[int]:
+    """
+    Split budget proportionally to weights, giving no item more than its size.
+
+    What an item does not need is redistributed among the others
+    (water-filling), so short posts do not waste the budget.
+    """
+    allocation = [0] * len(sizes)
+    open_items = [index for index, size in enumerate(sizes) if size > 0]
+    while open_items and budget > 0:
+        total_weight = sum(weights[index] for index in open_items)
+        shares = {index: budget * weights[index] / total_weight for index in open_items}
+        filled = [index for index in open_items if sizes[index] <= shares[index]]
+        if not filled:
+            for index in open_items:
+                allocation[index] = int(shares[index])
+            break
+        for index in filled:
+            allocation[index] = sizes[index]
+            budget -= sizes[index]
+        open_items = [index for index in open_items if index not in filled]
+    return allocation
+
+
+# Tokens kept free per post: a truncated text ends with "..." and token
+# counts of the parts of a post do not add up exactly
+POST_TOKEN_SLACK = 2
+
+
+def _fit_fixed_parts(posts: List[Dict[str, Any]], overhead, token_budget: int) -> List[Dict[str, Any]]:
+    """
+    Posts whose fixed parts (overhead without the text) fit token_budget.
+
+    Comments are dropped first, then whole posts, lowest engagement first;
+    the posts keep their order.
+    """
+    def fixed_cost(post):
+        return overhead({**post, "text": ""}) + POST_TOKEN_SLACK
+
+    costs = [fixed_cost(post) for post in posts]
+    total = sum(costs)
+    by_engagement = sorted(range(len(posts)), key=lambda index: _engagement(posts[index]))
+    for index in by_engagement:
+        if total <= token_budget:
+            break
+        if posts[index].get("comments"):
+            posts[index]["comments"] = []
+            cost = fixed_cost(posts[index])
+            total -= costs[index] - cost
+            costs[index] = cost
+
+    dropped = set()
+    for index in by_engagement:
+        if total <= token_budget:
+            break
+        dropped.add(index)
+        total -= costs[index]
+    return [post for index, post in enumerate(posts) if index not in dropped]
+
+
+def compact_posts(
+    posts: List[Dict[str, Any]],
+    token_budget: int,
+    min_tokens: int,
+    overhead=None,
+) -> List[Dict[str, Any]]:
+    """
+    Posts prepared for the analysis prompt within token_budget tokens.
+
+    Titles and texts are cleaned, posts with fewer than min_tokens tokens
+    left are skipped, and the texts share what remains of the budget after
+    the fixed part of every post (overhead(post), e.g. title, counters and
+    comments) proportionally to engagement. If the fixed parts alone exceed
+    the budget, comments and then the least engaging posts are left out.
+    """
+    kept = []
+    for post in posts:
+        title = clean_text(post.get("title"))
+        text = clean_text(post.get("text"))
+        if count_tokens(f"{title} {text}".strip()) < min_tokens:
+            continue
+        kept.append({**post, "title": title, "text": text})
+
+    if overhead is None:
+        fixed = 0
+    else:
+        kept = _fit_fixed_parts(kept, overhead, token_budget)
+        fixed = sum(overhead({**post, "text": ""}) + POST_TOKEN_SLACK for post in kept)
+    sizes = [count_tokens(post["text"]) if post["text"] else 0 for post in kept]
+    allocation = allocate_budget([_engagement(post) for post in kept], sizes, token_budget - fixed)
+    for post, size, tokens in zip(kept, sizes, allocation):
+        if tokens < size:
+            post["text"] = truncate_tokens(post["text"], tokens)
+    return kept
@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, Optional
+
+from backend.config import settings
+from backend.services.deadline import remaining
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+# Reddit listings return at most 100 items per request; without a limit
+# asyncpraw pages through a listing up to its 1000 items
+REDDIT_PAGE_SIZE = 100
+REDDIT_LISTING_MAX = 1000
+
+# Floor of the synced rate, while Reddit reports an exhausted window
+MIN_SYNCED_RATE = 0.01
+
+
+def search_cost(limit: Optional[int]) -> int:
+    """Number of Reddit requests a search with this limit needs"""
+    return max(1, math.ceil((limit or REDDIT_LISTING_MAX) / REDDIT_PAGE_SIZE))
+
+
+class LocalTokenBucket:
+    """Token bucket for the Reddit budget of the current process"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # time.monotonic() of the end of Reddit's current window, while the rate is synced
+        self.reset_at: Optional[float] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.reset_at is not None and now >= self.reset_at:
+            # Reddit's window is over: its budget is full again
+            self.rate = self.base_rate
+            self.tokens = self.capacity
+            self.reset_at = None
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def try_take(self, cost: float) -> float:
+        """Take cost tokens; returns 0 on success or the seconds to wait"""
+        self._refill()
+        # A cost above the capacity could never be paid: take the whole bucket
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        wait = (cost - self.tokens) / self.rate
+        if self.reset_at is not None:
+            wait = min(wait, self.reset_at - time.monotonic())
+        return max(wait, 0.0)
+
+    async def sync(self, remaining: float, seconds_to_reset: float) -> None:
+        """Follow Reddit's view of the budget (X-Ratelimit-* headers)"""
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+        self.rate = _synced_rate(self.base_rate, remaining, seconds_to_reset)
+        self.reset_at = time.monotonic() + seconds_to_reset if seconds_to_reset > 0 else None
+
+    async def close(self) -> None:
+        pass
+
+
+def _synced_rate(base_rate: float, remaining: float, seconds_to_reset: float) -> float:
+    # Spread what is left of the window over the time until the reset,
+    # but never go faster than the configured rate
+    if seconds_to_reset <= 0:
+        return base_rate
+    return max(MIN_SYNCED_RATE, min(base_rate, remaining / seconds_to_reset))
+
+
+# Same logic as LocalTokenBucket; reset_at is a wall-clock timestamp here
+# (0 when the rate is not synced), since processes share it
+TAKE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'rate', 'reset_at')
+local base_rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), capacity)
+local rate = tonumber(state[3]) or base_rate
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+local reset_at = tonumber(state[4]) or 0
+if reset_at > 0 and now >= reset_at then
+    rate = base_rate
+    tokens = capacity
+    reset_at = 0
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+end
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+    if reset_at > 0 then
+        wait = math.max(0, math.min(wait, reset_at - now))
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now), 'rate', tostring(rate),
+    'reset_at', tostring(reset_at))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+SYNC_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens')
+local remaining = tonumber(ARGV[1])
+local tokens = tonumber(state[1]) or remaining
+redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tokens, remaining)), 'rate', ARGV[2], 'reset_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], 3600)
+return 1
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket in Redis, so several processes share one Reddit budget"""
+
+    def __init__(self, url: str, rate: float, capacity: float, key: str = "reddit:ratelimit"):
+        import redis.asyncio as redis
+
+        self.base_rate = rate
+        self.capacity = capacity
+        self.key = key
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+        self._sync = self._redis.register_script(SYNC_SCRIPT)
+
+    async def try_take(self, cost: float) -> float:
+        try:
+            wait = await self._take(
+                keys=[self.key], args=[self.base_rate, self.capacity, time.time(), cost]
+            )
+            return float(wait)
+        except Exception as e:
+            # Fail open: asyncpraw still sleeps on Reddit's own headers
+            logger.error(f"Error taking Reddit budget from Redis: {str(e)}")
+            return 0.0
+
+    async def sync(self, remaining: float, seconds_to_reset: float) -> None:
+        rate = _synced_rate(self.base_rate, remaining, seconds_to_reset)
+        reset_at = time.time() + seconds_to_reset if seconds_to_reset > 0 else 0
+        try:
+            await self._sync(keys=[self.key], args=[remaining, rate, reset_at])
+        except Exception as e:
+            logger.error(f"Error syncing Reddit budget to Redis: {str(e)}")
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+class RedditScheduler:
+    """
+    Admission control for Reddit API calls.
+
+    Callers wait in per-priority queues; within a priority every user has
+    its own queue and users are served round-robin, so one user's burst
+    cannot starve the others. A waiter is admitted when the token bucket
+    has enough budget for its cost.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self._queues: Dict[int, "OrderedDict[Hashable, deque]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for queue in self._queues.values() for waiters in queue.values())
+
+    def _peek(self):
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                user, waiters = next(iter(queue.items()))
+                while waiters and waiters[0][0].done():
+                    waiters.popleft()  # cancelled while waiting
+                if waiters:
+                    return priority, user, waiters[0]
+                del queue[user]
+        return None
+
+    def _pop(self, priority: int, user: Hashable) -> None:
+        queue = self._queues[priority]
+        waiters = queue[user]
+        waiters.popleft()
+        if waiters:
+            queue.move_to_end(user)
+        else:
+            del queue[user]
+
+    def _discard(self, priority: int, user: Hashable, entry) -> None:
+        """Drop a waiter that gave up (cancelled or out of time)"""
+        queue = self._queues[priority]
+        waiters = queue.get(user)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(entry)
+        except ValueError:
+            return  # already admitted
+        if not waiters:
+            del queue[user]
+
+    async def _dispatch(self) -> None:
+        while True:
+            entry = self._peek()
+            if entry is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            priority, user, (future, cost) = entry
+            wait = await self.bucket.try_take(cost)
+            if wait > 0:
+                # Wake up early if a new waiter arrives: it may have a higher priority
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._pop(priority, user)
+            if not future.done():
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        user: Hashable,
+        priority: int = PRIORITY_INTERACTIVE,
+        cost: int = 1,
+    ) -> AsyncIterator[None]:
+        """
+        Wait for the turn of the user and for budget for cost Reddit requests.
+
+        The wait is bounded by the request deadline (services/deadline.py);
+        asyncio.TimeoutError is raised when it runs out first.
+        """
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="reddit-scheduler")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, cost)
+        self._queues[priority].setdefault(user, deque()).append(entry)
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(future, remaining())
+        except BaseException:
+            self._discard(priority, user, entry)
+            raise
+        yield
+
+    async def observe(self, reddit) -> None:
+        """Sync the bucket with the rate-limit headers of Reddit's last response"""
+        try:
+            limiter = reddit._core._rate_limiter
+            remaining, reset_timestamp = limiter.remaining, limiter.reset_timestamp
+        except AttributeError:
+            return
+        if remaining is None or reset_timestamp is None:
+            return
+        await self.bucket.sync(float(remaining), reset_timestamp - time.time())
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        await self.bucket.close()
+
+
+def create_reddit_scheduler() -> RedditScheduler:
+    """Создание планировщика запросов к Reddit по настройкам"""
+    rate = settings.REDDIT_REQUESTS_PER_MINUTE / 60
+    if settings.REDDIT_RATE_LIMIT_BACKEND == "redis":
+        bucket = RedisTokenBucket(settings.REDIS_URL, rate, settings.REDDIT_RATE_LIMIT_BURST)
+    else:
+        bucket = LocalTokenBucket(rate, settings.REDDIT_RATE_LIMIT_BURST)
+    return RedditScheduler(bucket)
+
+
+reddit_scheduler = create_reddit_scheduler()
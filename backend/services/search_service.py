@@ -0,0 +1,327 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.models.db_models import SearchHistory as DBSearchHistory
+from backend.models.search import SearchRequest
+from backend.services.ai_service import analyze_posts
+from backend.services.cache import search_cache, make_search_key
+from backend.services.comments import attach_comments
+from backend.services.deadline import DeadlineExceeded
+from backend.services.dedup import collapse_near_duplicates
+from backend.services.sentiment import score_posts
+from backend.services.post_store import ANNOTATION_FIELDS, POST_FIELDS, save_history
+from backend.services.reddit_scheduler import reddit_scheduler, search_cost, PRIORITY_INTERACTIVE
+from backend.services.text_stats import get_background_corpus
+from backend.services.timing import span
+
+logger = logging.getLogger(__name__)
+
+
+def search_sources(request: SearchRequest) -> List[Tuple[str, str, str]]:
+    """Distinct (subreddit, sort, time_filter) queries of a request"""
+    subreddits = dict.fromkeys(subreddit.strip().lower() for subreddit in request.subreddits)
+    return [
+        (subreddit, sort, time_filter)
+        for subreddit in subreddits
+        for sort in dict.fromkeys(request.sorts)
+        for time_filter in dict.fromkeys(request.time_filters)
+    ]
+
+
+def post_from_submission(submission) -> Dict[str, Any]:
+    """
+    Plain-dict post with the fields of models.search.RedditPost.
+
+    Posts stay dicts through analysis, caching and storage and are encoded
+    once for the response, instead of going through a pydantic model.
+    """
+    # Get author name safely
+    author_name = "[deleted]"
+    if submission.author is not None:
+        author_name = submission.author.name
+
+    return {
+        "id": submission.id,
+        "title": submission.title,
+        "text": submission.selftext,
+        "url": submission.url,
+        "score": submission.score,
+        "num_comments": submission.num_comments,
+        "created_utc": submission.created_utc,
+        "subreddit": submission.subreddit.display_name,
+        "author": author_name,
+        "permalink": f"https://reddit.com{submission.permalink}",
+    }
+
+
+async def _iter_source(
+    reddit,
+    request: SearchRequest,
+    source: Tuple[str, str, str],
+    user_id: Optional[int],
+    priority: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one Reddit search query, yielding posts as they are parsed.
+
+    The query waits for its turn in the Reddit scheduler first. Submissions
+    that fail to parse are logged and skipped.
+    """
+    subreddit_name, sort, time_filter = source
+    async with reddit_scheduler.acquire(user_id, priority, search_cost(request.limit)):
+        subreddit = await reddit.subreddit(subreddit_name)
+        submissions = subreddit.search(
+            query=request.topic,
+            sort=sort,
+            time_filter=time_filter,
+            limit=request.limit
+        )
+    async for submission in submissions:
+        try:
+            post = post_from_submission(submission)
+        except Exception as e:
+            logger.error(f"Error processing submission {submission.id}: {str(e)}")
+            continue
+        yield post
+    await reddit_scheduler.observe(reddit)
+
+
+_SOURCE_DONE = object()
+
+
+async def iter_posts(
+    reddit,
+    request: SearchRequest,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Search every source of the request concurrently and merge the results.
+
+    At most SEARCH_FANOUT_CONCURRENCY queries run at once. Posts are yielded
+    in arrival order; a submission found by several queries is yielded once.
+    A failing query is logged and skipped, unless every query failed.
+    """
+    sources = search_sources(request)
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(settings.SEARCH_FANOUT_CONCURRENCY)
+    errors: List[Exception] = []
+
+    async def pump(source: Tuple[str, str, str]) -> None:
+        try:
+            async with semaphore:
+                async for post in _iter_source(reddit, request, source, user_id, priority):
+                    await queue.put(post)
+        except Exception as e:
+            logger.error(f"Error searching r/{source[0]} ({source[1]}, {source[2]}): {str(e)}")
+            errors.append(e)
+        finally:
+            await queue.put(_SOURCE_DONE)
+
+    tasks = [asyncio.create_task(pump(source)) for source in sources]
+    seen = set()
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await queue.get()
+            if item is _SOURCE_DONE:
+                pending -= 1
+            elif item["id"] not in seen:
+                seen.add(item["id"])
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if errors and len(errors) == len(sources):
+        raise errors[0]
+
+
+async def fetch_posts(
+    reddit,
+    request: SearchRequest,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> List[Dict[str, Any]]:
+    with span("reddit"):
+        return [post async for post in iter_posts(reddit, request, user_id, priority)]
+
+
+async def _analyze(
+    reddit,
+    request: SearchRequest,
+    posts: List[Dict[str, Any]],
+    user_id: Optional[int],
+    priority: int,
+) -> Dict[str, Any]:
+    with span("scoring"):
+        score_posts(posts)
+    with span("dedup"):
+        representatives = collapse_near_duplicates(posts)
+    if request.include_comments:
+        # Only cluster representatives go into the prompt, so only they get comments
+        with span("comments"):
+            await attach_comments(reddit, representatives, user_id, priority)
+        comments = {post["id"]: post["comments"] for post in representatives}
+        for post in posts:
+            post["comments"] = comments.get(post["id"])
+    # Word and account statistics count every post with its own author and
+    # engagement; only the prompt is built from the representatives
+    analysis = await analyze_posts(posts, await get_background_corpus(), prompt_posts=representatives)
+    return {"posts": posts, "analysis": analysis}
+
+
+async def _fetch_and_analyze(reddit, request: SearchRequest, user_id, priority) -> Dict[str, Any]:
+    posts = await fetch_posts(reddit, request, user_id, priority)
+    return await _analyze(reddit, request, posts, user_id, priority)
+
+
+def _cache_key(request: SearchRequest) -> str:
+    return make_search_key(
+        request.topic,
+        request.limit,
+        request.subreddits,
+        request.sorts,
+        request.time_filters,
+        request.include_comments,
+    )
+
+
+def _cacheable(result: Dict[str, Any]) -> bool:
+    """A lexicon-only analysis (OpenAI failed or was cut by the deadline) is not cached"""
+    return result["analysis"].get("analysis_source") != "lexicon"
+
+
+def _from_cache(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Result as seen by a search that did not compute it itself.
+
+    Its token_usage is zeroed and the analysis marked "cached", so the
+    history entry of a cache hit does not repeat the tokens of the original
+    run. The posts are shared with the cached result.
+    """
+    analysis = result["analysis"]
+    usage = analysis.get("token_usage") or {}
+    return {
+        **result,
+        "analysis": {
+            **analysis,
+            "cached": True,
+            "token_usage": {**usage, "prompt_tokens": 0, "completion_tokens": 0, "requests": 0},
+        },
+    }
+
+
+async def run_search(
+    reddit,
+    request: SearchRequest,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> Dict[str, Any]:
+    """
+    Fetch and analyze posts for a search request.
+
+    Results are cached by the normalized topic, limit and sources, and
+    identical searches running at the same time share one Reddit fetch and
+    one LLM call; only the search that ran the computation reports its
+    token_usage (see _from_cache). The returned dict is shared with the
+    cache and must not be mutated. user_id and priority place the Reddit
+    call in the scheduler.
+
+    Under a request deadline the OpenAI call is cut when it runs out and the
+    lexicon analysis is returned instead (and not cached); DeadlineExceeded
+    is raised if not even that was ready, e.g. while Reddit was still
+    being searched.
+    """
+    computed = False
+
+    async def fetch_and_analyze() -> Dict[str, Any]:
+        nonlocal computed
+        computed = True
+        return await _fetch_and_analyze(reddit, request, user_id, priority)
+
+    try:
+        result = await search_cache.get_or_compute(_cache_key(request), fetch_and_analyze, _cacheable)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("Search deadline exceeded") from e
+    return result if computed else _from_cache(result)
+
+
+def _raw_post(post: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: post[field] for field in POST_FIELDS}
+
+
+async def stream_search(
+    reddit,
+    request: SearchRequest,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of run_search.
+
+    Yields ("post", post) for every post, ("annotations", {post id: fields})
+    with the ANNOTATION_FIELDS of every post, then ("analysis", analysis)
+    and finally ("result", result) with the complete result that run_search
+    would have returned. "post" events carry only the Reddit fields, whether
+    the result is computed, cached or shared with an identical search
+    already running. When this stream starts the computation, posts are
+    yielded as soon as they are parsed; otherwise once the result is ready
+    and its token_usage is zeroed, as in run_search. Deadlines are handled
+    as in run_search.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    computed = False
+
+    async def fetch_and_analyze() -> Dict[str, Any]:
+        nonlocal computed
+        computed = True
+        posts = []
+        with span("reddit"):
+            async for post in iter_posts(reddit, request, user_id, priority):
+                posts.append(post)
+                # A copy: the analysis annotates the posts in place
+                queue.put_nowait(_raw_post(post))
+        queue.put_nowait(_SOURCE_DONE)
+        return await _analyze(reddit, request, posts, user_id, priority)
+
+    computation = asyncio.ensure_future(
+        search_cache.get_or_compute(_cache_key(request), fetch_and_analyze, _cacheable)
+    )
+    streamed = set()
+    try:
+        while not computation.done():
+            next_post = asyncio.ensure_future(queue.get())
+            await asyncio.wait({next_post, computation}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_post.done():
+                next_post.cancel()
+                break
+            if next_post.result() is _SOURCE_DONE:
+                break
+            streamed.add(next_post.result()["id"])
+            yield "post", next_post.result()
+        result = await computation
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("Search deadline exceeded") from e
+    finally:
+        computation.cancel()
+    if not computed:
+        result = _from_cache(result)
+
+    # Cached or shared result: nothing (or not everything) was streamed yet
+    for post in result["posts"]:
+        if post["id"] not in streamed:
+            yield "post", _raw_post(post)
+    yield "annotations", {
+        post["id"]: {field: post.get(field) for field in ANNOTATION_FIELDS} for post in result["posts"]
+    }
+    yield "analysis", result["analysis"]
+    yield "result", result
+
+
+async def save_search_history(session, user_id: int, topic: str, result: Dict[str, Any]) -> DBSearchHistory:
+    """Сохранение результата поиска в историю пользователя"""
+    return await save_history(session, user_id, topic, result)
@@ -0,0 +1,160 @@
+import string
+from itertools import repeat
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Punctuation and digits become spaces, so str.split() yields the words (faster than a regex);
+# typographic apostrophes become ', so "don’t" is the negation "don't"
+WORD_TRANSLATION = str.maketrans({
+    **{char: " " for char in string.punctuation.replace("'", "") + string.digits},
+    "\u2019": "'",
+    "\u2018": "'",
+    "\u02bc": "'",
+})
+
+# Valence in [-3, 3], a small subset in the spirit of the VADER lexicon
+VALENCE = {
+    **dict.fromkeys("""
+        amazing awesome excellent fantastic incredible love loved loving outstanding perfect
+        superb wonderful brilliant beautiful thrilled
+    """.split(), 3.0),
+    **dict.fromkeys("""
+        best better enjoy enjoyed excited glad good great happy helpful impressive
+        interesting like liked nice recommend solid success successful thanks useful win
+        works worth cool fun fast easy fixed improved support agree
+    """.split(), 2.0),
+    **dict.fromkeys("""
+        fine okay ok decent fair hope hopefully promising stable clean
+    """.split(), 1.0),
+    **dict.fromkeys("""
+        annoying bad boring bug buggy confusing difficult disappointed disappointing fail
+        failed fails problem problems slow sad wrong worse issue issues broken crash crashes
+        expensive hard lost missing unfortunately weird concerned worried
+    """.split(), -2.0),
+    **dict.fromkeys("""
+        awful disaster disgusting garbage hate hated horrible pathetic terrible trash useless
+        worst nightmare scam ridiculous furious angry
+    """.split(), -3.0),
+}
+
+# Insults, profanity and hostility; weight per occurrence
+TOXICITY = {
+    **dict.fromkeys("""
+        idiot idiots idiotic moron morons stupid dumb loser losers shut pathetic clown
+        clowns trash garbage disgusting
+    """.split(), 1.0),
+    **dict.fromkeys("""
+        fuck fucking fucked shit shitty bullshit asshole assholes bitch bastard crap damn
+        hell
+    """.split(), 2.0),
+}
+
+NEGATIONS = frozenset("""
+    not no never none nobody nothing neither nor cannot can't don't doesn't didn't isn't
+    aren't wasn't weren't won't wouldn't shouldn't couldn't hardly barely without
+""".split())
+
+# Scores of a post: compound sentiment in [-1, 1] and toxicity in [0, 1]
+SENTIMENT_NEUTRAL_BAND = 0.05
+NORMALIZATION_ALPHA = 15.0
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.75
+
+_terms = sorted(set(VALENCE) | set(TOXICITY))
+NEGATION_CODE = -2
+# Word -> lexicon column, or NEGATION_CODE for negations
+_codes = {**dict.fromkeys(NEGATIONS, NEGATION_CODE), **{term: column for column, term in enumerate(_terms)}}
+_valence = np.array([VALENCE.get(term, 0.0) for term in _terms])
+_toxicity = np.array([TOXICITY.get(term, 0.0) for term in _terms])
+
+
+def sentiment_label(score: float) -> str:
+    if score > SENTIMENT_NEUTRAL_BAND:
+        return "positive"
+    if score < -SENTIMENT_NEUTRAL_BAND:
+        return "negative"
+    return "neutral"
+
+
+def score_posts(posts: List[Dict[str, Any]]) -> None:
+    """
+    Set sentiment_score and toxicity_score on every post.
+
+    The words of the whole batch are looked up in the lexicons in one pass
+    and scored with NumPy at once. A negation flips (and dampens) the next
+    lexicon hit within NEGATION_WINDOW words of the same title or text, so
+    a negation ending the title does not reach the text. Sentiment is the
+    VADER-style normalized sum of valences, toxicity grows with the density
+    of toxic words.
+    """
+    if not posts:
+        return
+
+    # Title and text of every post, in that order: segment 2 * i and 2 * i + 1
+    segments = [
+        str(post.get(field) or "").lower().translate(WORD_TRANSLATION).split()
+        for post in posts
+        for field in ("title", "text")
+    ]
+    segment_lengths = np.fromiter(map(len, segments), dtype=np.int64, count=len(segments))
+    lengths = segment_lengths.reshape(-1, 2).sum(axis=1)
+    words = [word for segment in segments for word in segment]
+    segment_of_word = np.repeat(np.arange(len(segments)), segment_lengths)
+    post_of_word = segment_of_word // 2
+
+    columns = np.fromiter(map(_codes.get, words, repeat(-1)), dtype=np.int64, count=len(words))
+    is_negation = columns == NEGATION_CODE
+    is_hit = columns >= 0
+
+    # Position of the latest negation and of the latest hit before every word
+    positions = np.arange(len(words))
+    last_negation = np.maximum.accumulate(np.where(is_negation, positions, -1)) if len(words) else positions
+    previous_hit = np.concatenate(([-1], np.maximum.accumulate(np.where(is_hit, positions, -1))[:-1])) \
+        if len(words) else positions
+    negated = (
+        (last_negation >= 0)
+        & (positions - last_negation <= NEGATION_WINDOW)
+        & (last_negation > previous_hit)
+        & (segment_of_word == segment_of_word[np.maximum(last_negation, 0)])
+    )
+
+    hits = np.flatnonzero(is_hit)
+    signs = np.where(negated[hits], NEGATION_FACTOR, 1.0)
+    valence_sums = np.bincount(
+        post_of_word[hits], weights=signs * _valence[columns[hits]], minlength=len(posts)
+    )
+    toxicity_sums = np.bincount(
+        post_of_word[hits], weights=_toxicity[columns[hits]], minlength=len(posts)
+    )
+
+    sentiment = valence_sums / np.sqrt(valence_sums ** 2 + NORMALIZATION_ALPHA)
+    toxicity = 1.0 - np.exp(-3.0 * toxicity_sums / np.sqrt(lengths + 1.0))
+
+    for post, post_sentiment, post_toxicity in zip(posts, sentiment, toxicity):
+        post["sentiment_score"] = round(float(post_sentiment), 3)
+        post["toxicity_score"] = round(float(post_toxicity), 3)
+
+
+def aggregate_scores(posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Engagement-weighted sentiment and toxicity of scored posts, with the label distribution"""
+    if not posts:
+        return {
+            "post_sentiment": 0.0,
+            "post_toxicity": 0.0,
+            "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0},
+        }
+
+    weights = np.array(
+        [max(post["score"], 0) + max(post["num_comments"], 0) + 1 for post in posts], dtype=np.float64
+    )
+    sentiment = np.array([post["sentiment_score"] for post in posts])
+    toxicity = np.array([post["toxicity_score"] for post in posts])
+    distribution = {"positive": 0, "neutral": 0, "negative": 0}
+    for score in sentiment:
+        distribution[sentiment_label(score)] += 1
+    return {
+        "post_sentiment": round(float(np.average(sentiment, weights=weights)), 3),
+        "post_toxicity": round(float(np.average(toxicity, weights=weights)), 3),
+        "sentiment_distribution": distribution,
+    }
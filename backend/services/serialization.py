@@ -0,0 +1,25 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value: Any) -> bytes:
+    """JSON encoding of API payloads and cache entries"""
+    return orjson.dumps(value, option=OPTIONS)
+
+
+def dumps_text(value: Any) -> str:
+    """Same encoding as str, for SQLAlchemy JSON columns"""
+    return orjson.dumps(value, option=OPTIONS).decode()
+
+
+loads = orjson.loads
+
+
+class RawJSONResponse(Response):
+    """Response for a payload that is already encoded JSON (no validation, no re-encoding)"""
+
+    media_type = "application/json"
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from backend.config import settings
+from backend.database import AsyncSessionLocal
+from backend.models.db_models import RedditPost as DBRedditPost
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[^\W\d_][\w']+")
+
+STOPWORDS = frozenset("""
+a about above after again against all almost also although always am among an and another any anyone
+anything are aren't around as at be because been before being below between both but by can can't
+cannot could couldn't did didn't do does doesn't doing don't done down during each either else even
+ever every few for from further get gets getting got had hadn't has hasn't have haven't having he
+he'd he'll he's her here here's hers herself him himself his how how's however i i'd i'll i'm i've
+if in into is isn't it it's its itself just know last less let let's like make many may me might
+more most much must mustn't my myself need never new no nor not now of off often on once one only
+or other others our ours ourselves out over own people really right said same say says see she
+she'd she'll she's should shouldn't since so some something still such than that that's the their
+theirs them themselves then there there's these they they'd they'll they're they've thing things
+think this those though through time to too two under until up upon us use used using very via want
+was wasn't way we we'd we'll we're we've well were weren't what what's when when's where where's
+whether which while who who's whom why why's will with within without won't would wouldn't yes yet
+you you'd you'll you're you've your yours yourself yourselves
+amp com deleted gt http https imgur jpg lt png reddit removed www
+""".split())
+
+IGNORED_AUTHORS = frozenset({"[deleted]", "AutoModerator"})
+
+MAX_FREQUENT_WORDS = 10
+MAX_INFLUENTIAL_ACCOUNTS = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords and very short words"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.strip("'")
+        if token.endswith("'s"):
+            token = token[:-2]
+        if len(token) > 2 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def post_document(post: Dict[str, Any]) -> str:
+    return f"{post.get('title', '')}\n{post.get('text', '')}"
+
+
+class BackgroundCorpus:
+    """Document frequencies of terms in previously stored search results"""
+
+    def __init__(self, doc_freq: Dict[str, int], num_docs: int):
+        self.doc_freq = doc_freq
+        self.num_docs = num_docs
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[str]) -> "BackgroundCorpus":
+        doc_freq: Dict[str, int] = {}
+        num_docs = 0
+        for document in documents:
+            num_docs += 1
+            for term in set(tokenize(document)):
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+        return cls(doc_freq, num_docs)
+
+    def document_frequencies(self, terms: List[str]) -> np.ndarray:
+        return np.fromiter(
+            (self.doc_freq.get(term, 0) for term in terms),
+            dtype=np.float64,
+            count=len(terms),
+        )
+
+
+EMPTY_CORPUS = BackgroundCorpus({}, 0)
+
+
+def rank_frequent_words(
+    posts: List[Dict[str, Any]],
+    corpus: Optional[BackgroundCorpus] = None,
+    top_n: int = MAX_FREQUENT_WORDS,
+) -> List[str]:
+    """
+    Rank keywords of the batch by TF-IDF.
+
+    Term frequencies are normalized per post and summed over the batch;
+    inverse document frequencies combine the background corpus with the
+    batch itself, so words common to every search rank low.
+    """
+    corpus = corpus or EMPTY_CORPUS
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, post in enumerate(posts):
+        for token in tokenize(post_document(post)):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    if not vocabulary:
+        return []
+
+    # Sparse accumulation over the (post, term) occurrences: a dense
+    # posts x vocabulary matrix grows quadratically with the batch
+    num_terms = len(vocabulary)
+    rows_array = np.asarray(rows)
+    cols_array = np.asarray(cols)
+    doc_lengths = np.bincount(rows_array, minlength=len(posts)).astype(np.float64)
+    tf_sum = np.bincount(cols_array, weights=1.0 / doc_lengths[rows_array], minlength=num_terms)
+
+    # A term counts once per post for the document frequency
+    pairs = np.unique(rows_array.astype(np.int64) * num_terms + cols_array)
+    batch_doc_freq = np.bincount(pairs % num_terms, minlength=num_terms)
+
+    terms = list(vocabulary)
+    doc_freq = corpus.document_frequencies(terms) + batch_doc_freq
+    num_docs = corpus.num_docs + len(posts)
+    idf = np.log((1.0 + num_docs) / (1.0 + doc_freq)) + 1.0
+
+    scores = tf_sum * idf
+    top = np.argsort(-scores, kind="stable")[:top_n]
+    return [terms[i] for i in top]
+
+
+def rank_influential_accounts(
+    posts: List[Dict[str, Any]],
+    top_n: int = MAX_INFLUENTIAL_ACCOUNTS,
+) -> List[str]:
+    """Rank authors by total engagement (score + number of comments)"""
+    posts = [post for post in posts if post.get("author") not in IGNORED_AUTHORS]
+    if not posts:
+        return []
+
+    authors = np.array([post["author"] for post in posts])
+    engagement = np.array(
+        [post["score"] + post["num_comments"] for post in posts], dtype=np.float64
+    )
+    names, inverse = np.unique(authors, return_inverse=True)
+    totals = np.bincount(inverse, weights=engagement)
+    top = np.argsort(-totals, kind="stable")[:top_n]
+    return [str(names[i]) for i in top]
+
+
+def compute_post_statistics(
+    posts: List[Dict[str, Any]],
+    corpus: Optional[BackgroundCorpus] = None,
+) -> Dict[str, Any]:
+    """Local replacement for the frequent_words / influential_accounts LLM fields"""
+    return {
+        "frequent_words": rank_frequent_words(posts, corpus),
+        "influential_accounts": rank_influential_accounts(posts),
+    }
+
+
+async def load_background_corpus(session, limit: int) -> BackgroundCorpus:
+    """Build the background corpus from the most recently stored posts"""
+    result = await session.execute(
+        select(DBRedditPost.title, DBRedditPost.text)
+        .order_by(DBRedditPost.updated_at.desc())
+        .limit(limit)
+    )
+    return BackgroundCorpus.from_documents(
+        f"{title or ''}\n{text or ''}" for title, text in result.all()
+    )
+
+
+_corpus: Optional[BackgroundCorpus] = None
+_corpus_loaded_at = -math.inf
+_corpus_lock = asyncio.Lock()
+
+
+async def get_background_corpus() -> BackgroundCorpus:
+    """
+    Cached background corpus, refreshed every BACKGROUND_CORPUS_TTL_SECONDS.
+
+    Falls back to the previous (or an empty) corpus if the refresh fails.
+    """
+    global _corpus, _corpus_loaded_at
+
+    loop = asyncio.get_running_loop()
+    if _corpus is not None and loop.time() - _corpus_loaded_at < settings.BACKGROUND_CORPUS_TTL_SECONDS:
+        return _corpus
+
+    async with _corpus_lock:
+        if _corpus is not None and loop.time() - _corpus_loaded_at < settings.BACKGROUND_CORPUS_TTL_SECONDS:
+            return _corpus
+        try:
+            async with AsyncSessionLocal() as session:
+                _corpus = await load_background_corpus(
+                    session, settings.BACKGROUND_CORPUS_POST_LIMIT
+                )
+            logger.debug(f"Loaded background corpus with {_corpus.num_docs} documents")
+        except Exception as e:
+            logger.error(f"Error loading background corpus: {str(e)}")
+            _corpus = _corpus or EMPTY_CORPUS
+        _corpus_loaded_at = loop.time()
+        return _corpus
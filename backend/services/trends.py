@@ -0,0 +1,113 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.models.db_models import TopicTrend
+
+logger = logging.getLogger(__name__)
+
+TOP_WORDS = 10
+
+SENTIMENT_COLUMNS = {
+    "positive": "positive_count",
+    "neutral": "neutral_count",
+    "negative": "negative_count",
+}
+
+COUNTER_COLUMNS = (
+    "search_count", "post_count", "score_sum",
+    "positive_count", "neutral_count", "negative_count", "toxicity_sum",
+)
+
+# Sum of the stored and the new word counts, key by key
+MERGED_WORD_COUNTS = literal_column("""(
+    SELECT COALESCE(jsonb_object_agg(key, total), '{}'::jsonb)
+    FROM (
+        SELECT key, SUM(value::integer) AS total
+        FROM (
+            SELECT * FROM jsonb_each_text(topic_trends.word_counts)
+            UNION ALL
+            SELECT * FROM jsonb_each_text(excluded.word_counts)
+        ) AS pairs
+        GROUP BY key
+    ) AS merged
+)""")
+
+
+def normalize_topic(topic: str) -> str:
+    """Topic as it is stored in the rollups (same normalization as the search cache)"""
+    return " ".join(topic.lower().split())
+
+
+def trend_increment(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Contribution of one search result to its day's rollup row"""
+    posts = result.get("posts", [])
+    analysis = result.get("analysis") or {}
+    increment = {column: 0 for column in COUNTER_COLUMNS}
+    increment.update(
+        search_count=1,
+        post_count=len(posts),
+        score_sum=sum(int(post.get("score") or 0) for post in posts),
+        toxicity_sum=float(analysis.get("toxicity_level") or 0.0),
+    )
+    sentiment = str(analysis.get("overall_sentiment", "neutral")).lower()
+    increment[SENTIMENT_COLUMNS.get(sentiment, "neutral_count")] = 1
+    increment["word_counts"] = {word: 1 for word in analysis.get("frequent_words") or []}
+    return increment
+
+
+async def record_search_trend(
+    session,
+    topic: str,
+    result: Dict[str, Any],
+    day: Optional[date] = None,
+) -> None:
+    """Add a saved search to the rollup of its topic and day (one upsert)"""
+    row = {
+        "topic": normalize_topic(topic),
+        "day": day or datetime.now(timezone.utc).date(),
+        **trend_increment(result),
+    }
+    statement = insert(TopicTrend).values(row)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TopicTrend.topic, TopicTrend.day],
+        set_={
+            **{
+                column: getattr(TopicTrend, column) + statement.excluded[column]
+                for column in COUNTER_COLUMNS
+            },
+            "word_counts": MERGED_WORD_COUNTS,
+            "updated_at": func.now(),
+        },
+    )
+    await session.execute(statement)
+
+
+def _trend_point(row: TopicTrend) -> Dict[str, Any]:
+    searches = row.search_count or 1
+    top_words = sorted(row.word_counts.items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "day": row.day,
+        "searches": row.search_count,
+        "posts": row.post_count,
+        "mean_score": round(row.score_sum / row.post_count, 2) if row.post_count else 0.0,
+        "sentiment": {
+            sentiment: getattr(row, column) for sentiment, column in SENTIMENT_COLUMNS.items()
+        },
+        "mean_toxicity": round(row.toxicity_sum / searches, 3),
+        "top_words": [word for word, _ in top_words[:TOP_WORDS]],
+    }
+
+
+async def get_topic_trend(session, topic: str, days: int) -> List[Dict[str, Any]]:
+    """Daily rollups of a topic for the last days days, oldest first"""
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    result = await session.execute(
+        select(TopicTrend)
+        .where(TopicTrend.topic == normalize_topic(topic), TopicTrend.day >= since)
+        .order_by(TopicTrend.day)
+    )
+    return [_trend_point(row) for row in result.scalars().all()]
@@ -0,0 +1,93 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Optional
+
+from backend.config import settings
+from backend.services.cache import TTLCache
+
+
+class CachedUser:
+    """Immutable snapshot of an authenticated user"""
+
+    __slots__ = ("id", "username", "email", "is_active", "created_at")
+
+    def __init__(self, id: int, username: str, email: str, is_active: bool, created_at: Optional[datetime]):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "email", email)
+        object.__setattr__(self, "is_active", is_active)
+        object.__setattr__(self, "created_at", created_at)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CachedUser is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CachedUser is immutable")
+
+    def __repr__(self) -> str:
+        return f"CachedUser(id={self.id!r}, username={self.username!r})"
+
+    @classmethod
+    def from_db(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active is not False,
+            created_at=user.created_at,
+        )
+
+
+class UserCache:
+    """
+    Maps validated access tokens to user snapshots.
+
+    Entries live for AUTH_CACHE_TTL_SECONDS, but never longer than the
+    token itself. Tokens are stored as hashes.
+
+    The app has no endpoint that changes or deactivates a user; that is
+    done in the database, so only the short TTL bounds how long a changed
+    user keeps its cached snapshot. A code path that changes a user must
+    call invalidate_user, which still reaches only its own process.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[CachedUser]:
+        entry = self._cache.get(self._key(token))
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._cache.invalidate(self._key(token))
+            return None
+        return user
+
+    def set(self, token: str, user: CachedUser, expires_at: Optional[float] = None) -> None:
+        ttl = self._cache.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self._cache.set(self._key(token), (user, expires_at), ttl=ttl)
+
+    def invalidate_user(self, username: str) -> int:
+        """Drop all cached tokens of the user (call after changing or deactivating a user)"""
+        return self._cache.discard_if(lambda entry: entry[0].username == username)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+user_cache = UserCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
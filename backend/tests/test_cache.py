@@ -0,0 +1,263 @@
+import asyncio
+
+import pytest
+
+from backend.services import cache as cache_module
+from backend.services.cache import InMemoryBackend, RedisBackend, SearchResultCache, TTLCache
+from backend.services.deadline import deadline, remaining
+from backend.services.serialization import dumps
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+
+def make_cache(remote=None, ttl=60):
+    return SearchResultCache(TTLCache(maxsize=8, ttl=ttl), remote=remote)
+
+
+class CountingFactory:
+    """Factory that blocks until released and counts its calls"""
+
+    def __init__(self, value=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.value = value if value is not None else {"posts": [], "analysis": {}}
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("key", "value")
+    clock.now += 9
+    assert cache.get("key") == "value"
+    clock.now += 2
+    assert cache.get("key") is None
+    assert len(cache) == 0
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_ttl_cache_per_entry_ttl_and_lru_eviction(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    clock.now += 2
+    assert cache.get("short") is None
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_concurrent_callers_share_one_computation():
+    async def scenario():
+        cache = make_cache()
+        factory = CountingFactory()
+        callers = [asyncio.create_task(cache.get_or_compute("key", factory)) for _ in range(5)]
+        await asyncio.sleep(0)
+        factory.release.set()
+        results = await asyncio.gather(*callers)
+
+        assert factory.calls == 1
+        assert all(result is factory.value for result in results)
+        # Served from the local tier afterwards
+        assert await cache.get_or_compute("key", factory) is factory.value
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        cache = make_cache()
+        factory = CountingFactory()
+        leader = asyncio.create_task(cache.get_or_compute("key", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("key", factory))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        factory.release.set()
+
+        assert await follower is factory.value
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_computation_outlives_every_cancelled_caller():
+    async def scenario():
+        cache = make_cache()
+        factory = CountingFactory()
+        caller = asyncio.create_task(cache.get_or_compute("key", factory))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        factory.release.set()
+        await asyncio.sleep(0.01)
+        assert cache.local.get("key") is factory.value
+
+    asyncio.run(scenario())
+
+
+def test_caller_deadline_only_bounds_its_own_wait():
+    async def scenario():
+        cache = make_cache()
+        factory = CountingFactory()
+        seen_deadlines = []
+
+        async def observed_factory():
+            seen_deadlines.append(remaining())
+            return await factory()
+
+        async def impatient():
+            with deadline(0.01):
+                return await cache.get_or_compute("key", observed_factory)
+
+        leader = asyncio.create_task(impatient())
+        follower = asyncio.create_task(cache.get_or_compute("key", observed_factory))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+
+        factory.release.set()
+        assert await follower is factory.value
+        # The shared computation runs under the latest deadline: the follower has none
+        assert seen_deadlines == [None]
+
+    asyncio.run(scenario())
+
+
+def test_factory_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        cache = make_cache()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("reddit down")
+
+        results = await asyncio.gather(
+            cache.get_or_compute("key", failing),
+            cache.get_or_compute("key", failing),
+            return_exceptions=True,
+        )
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("key", failing)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_remote_tier_is_read_before_computing():
+    async def scenario():
+        remote = InMemoryBackend()
+        value = {"posts": [{"id": "a"}], "analysis": {"summary": "cached"}}
+        await remote.set("search:key", dumps(value), 60)
+        cache = make_cache(remote)
+        factory = CountingFactory()
+
+        assert await cache.get_or_compute("key", factory) == value
+        assert factory.calls == 0
+        # And copied into the local tier
+        assert cache.local.get("key") == value
+
+    asyncio.run(scenario())
+
+
+def test_computed_values_are_written_to_the_remote_tier():
+    async def scenario():
+        remote = InMemoryBackend()
+        cache = make_cache(remote)
+        factory = CountingFactory({"posts": [], "analysis": {"summary": "fresh"}})
+        factory.release.set()
+
+        await cache.get_or_compute("key", factory)
+        other_process = make_cache(remote)
+        assert await other_process.get("key") == factory.value
+
+    asyncio.run(scenario())
+
+
+def test_remote_errors_fall_back_to_computing():
+    class BrokenBackend:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+        async def set(self, key, value, ttl):
+            raise ConnectionError("redis down")
+
+        async def close(self):
+            pass
+
+    async def scenario():
+        cache = make_cache(BrokenBackend())
+        factory = CountingFactory()
+        factory.release.set()
+        assert await cache.get_or_compute("key", factory) is factory.value
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_redis_backend_sets_whole_second_expiry():
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+
+        async def get(self, key):
+            return self.data.get(key, (None, None))[0]
+
+        async def set(self, key, value, ex):
+            self.data[key] = (value, ex)
+
+    async def scenario():
+        backend = RedisBackend("redis://localhost:6379/0")
+        backend._redis = FakeRedis()
+        await backend.set("search:key", b"{}", 0.4)
+        await backend.set("search:other", b"[]", 300)
+        assert backend._redis.data == {"search:key": (b"{}", 1), "search:other": (b"[]", 300)}
+        assert await backend.get("search:key") == b"{}"
+
+    asyncio.run(scenario())
+
+
+def test_uncacheable_result_reaches_the_callers_only():
+    async def scenario():
+        cache = make_cache(remote=InMemoryBackend())
+        factory = CountingFactory()
+        factory.release.set()
+
+        first = await cache.get_or_compute("key", factory, cacheable=lambda value: False)
+        assert first is factory.value
+        assert cache.local.get("key") is None
+        assert await cache.get("key") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+from backend.services.executor import BlockingExecutor
+from backend.services.metrics import EXECUTOR_WAIT, registry
+
+
+def wait_count():
+    return next(value for name, _, value in EXECUTOR_WAIT.samples() if name == "executor_wait_seconds_count") \
+        if EXECUTOR_WAIT.samples() else 0
+
+
+def test_every_wait_is_observed_in_the_histogram():
+    async def scenario():
+        executor = BlockingExecutor(threads=1)
+        before = wait_count()
+        # One worker: the second task waits for the first one
+        await asyncio.gather(executor.run(time.sleep, 0.05), executor.run(time.sleep, 0))
+        executor.shutdown()
+        return before
+
+    before = asyncio.run(scenario())
+    assert wait_count() == before + 2
+    rendered = registry.render()
+    assert "# TYPE executor_wait_seconds histogram" in rendered
+    assert 'executor_wait_seconds_bucket{le="+Inf"}' in rendered
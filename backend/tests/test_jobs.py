@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from backend.config import settings
+from backend.services.jobs import (
+    JOB_DONE,
+    JOB_PENDING,
+    JOB_RUNNING,
+    InProcessJobBackend,
+    RedisJobBackend,
+    create_job_manager,
+)
+
+
+class FakeRedis:
+    """Lists and strings of redis.asyncio used by RedisJobBackend; BLMOVE never blocks"""
+
+    def __init__(self):
+        self.data = {}
+        self.lists = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex):
+        self.data[key] = value
+
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    async def blmove(self, source, destination, timeout, src, dest):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop()
+        self.lists.setdefault(destination, []).insert(0, value)
+        return value
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        removed = 0
+        for item in list(items):
+            if item == value.encode() and (count == 0 or removed < count):
+                items.remove(item)
+                removed += 1
+        return removed
+
+
+def make_backend(lease=60):
+    backend = RedisJobBackend("redis://localhost:6379/0", result_ttl=3600, lease=lease)
+    backend._redis = FakeRedis()
+    return backend
+
+
+def make_job(job_id):
+    now = time.time()
+    return {"id": job_id, "status": JOB_PENDING, "created_at": now, "updated_at": now}
+
+
+def test_job_of_a_dead_worker_is_requeued_after_the_lease():
+    async def scenario():
+        backend = make_backend(lease=60)
+        await backend.enqueue(make_job("a"))
+
+        job = await backend.dequeue()
+        await backend.update(job["id"], status=JOB_RUNNING)
+        # The worker dies here: no ack, the job stays in the processing list
+        assert await backend.requeue_stale() == 0
+        assert backend._redis.lists["jobs:processing"] == [b"a"]
+
+        job = await backend.get("a")
+        job["updated_at"] = time.time() - 120
+        await backend._save(job)
+        assert await backend.requeue_stale() == 1
+        assert backend._redis.lists["jobs:processing"] == []
+        assert (await backend.get("a"))["status"] == JOB_PENDING
+
+        job = await backend.dequeue()
+        assert job["id"] == "a"
+        await backend.update("a", status=JOB_DONE)
+        await backend.ack("a")
+        assert backend._redis.lists["jobs:processing"] == []
+        assert backend._redis.lists["jobs:queue"] == []
+
+    asyncio.run(scenario())
+
+
+def test_redis_job_backend_without_redis_url_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BACKEND", "redis")
+    monkeypatch.setattr(settings, "REDIS_URL", None)
+    manager = create_job_manager()
+    assert isinstance(manager.backend, InProcessJobBackend)
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from backend.services import post_store
+
+
+class FakeSession:
+    """Records what save_history writes, without a database"""
+
+    def __init__(self):
+        self.added = []
+        self.statements = []
+        self.committed = False
+
+    def add(self, row):
+        self.added.append(row)
+
+    async def flush(self):
+        for index, row in enumerate(self.added, start=1):
+            if getattr(row, "id", None) is None:
+                row.id = index
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def trends(monkeypatch):
+    recorded = []
+
+    async def record_search_trend(session, topic, result):
+        recorded.append(topic)
+
+    monkeypatch.setattr(post_store, "record_search_trend", record_search_trend)
+    return recorded
+
+
+RESULT = {
+    "posts": [{field: f"{field}-1" for field in post_store.POST_FIELDS}],
+    "analysis": {"overall_sentiment": "positive", "frequent_words": ["python"]},
+}
+
+
+def test_server_searches_feed_the_trends(trends):
+    session = FakeSession()
+    asyncio.run(post_store.save_history(session, 1, "python", RESULT))
+
+    assert trends == ["python"]
+    assert session.committed
+
+
+def test_client_results_do_not_touch_shared_tables(trends):
+    session = FakeSession()
+    history = asyncio.run(post_store.save_history(session, 1, "python", RESULT, store_posts=False))
+
+    assert trends == []
+    # No reddit_posts upsert and no link rows: only the history row itself
+    assert session.statements == []
+    assert session.added == [history]
+    assert history.results["posts"] == RESULT["posts"]
+    assert session.committed
+
+
+def test_links_keep_the_post_as_the_search_returned_it(trends):
+    post = {
+        **RESULT["posts"][0],
+        "score": 10,
+        "sentiment_score": 0.5,
+        "toxicity_score": 0.1,
+        "cluster_size": 2,
+        "duplicate_of": None,
+        "comments": ["first"],
+    }
+    session = FakeSession()
+    asyncio.run(post_store.save_history(session, 1, "python", {**RESULT, "posts": [post]}))
+
+    [link] = [row for row in session.added if isinstance(row, post_store.DBSearchHistoryPost)]
+    assert link.snapshot == {field: post[field] for field in post_store.SNAPSHOT_FIELDS}
+
+    # Read back over the latest reddit_posts row
+    class StoredPost:
+        pass
+
+    stored = StoredPost()
+    for field in post_store.POST_FIELDS:
+        setattr(stored, field, post[field])
+    stored.score = 99
+    assert post_store._post_dict(stored, link.snapshot)["score"] == 10
+    assert post_store._post_dict(stored, None)["score"] == 99
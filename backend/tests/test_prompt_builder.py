@@ -0,0 +1,50 @@
+from backend.services.ai_service import format_post
+from backend.services.prompt_builder import compact_posts, count_tokens
+
+
+def make_posts(count, comments=True, text="I tried pip, poetry and uv on the same project and here is what happened. " * 20):
+    return [
+        {
+            "id": str(index),
+            "title": f"Post number {index} about python packaging and virtual environments",
+            "text": text,
+            "score": index,
+            "num_comments": 3,
+            "comments": ["Use uv, it resolves everything in seconds for me. " * 5] * 3 if comments else None,
+        }
+        for index in range(count)
+    ]
+
+
+def prompt_tokens(posts):
+    return sum(count_tokens(format_post(post)) for post in posts)
+
+
+def compact(posts, budget):
+    return compact_posts(posts, budget, 4, overhead=lambda post: count_tokens(format_post(post)))
+
+
+def test_prompt_stays_within_the_budget():
+    for comments in (False, True):
+        for budget in (500, 6000, 40000):
+            kept = compact(make_posts(300, comments), budget)
+            assert kept
+            assert prompt_tokens(kept) <= budget
+
+
+def test_comments_go_before_posts_and_least_engaging_posts_first():
+    # Without texts the prompt is only the fixed parts
+    posts = make_posts(20, text="")
+    with_comments = prompt_tokens(compact(posts, 100000))
+    without_comments = prompt_tokens(compact(make_posts(20, comments=False, text=""), 100000))
+    budget = (with_comments + without_comments) // 2
+
+    kept = compact(posts, budget)
+    assert len(kept) == 20
+    assert not kept[0]["comments"]
+    assert kept[-1]["comments"]
+
+    kept = compact(posts, 300)
+    ids = [post["id"] for post in kept]
+    assert 0 < len(ids) < 20
+    assert ids == [str(index) for index in range(20 - len(ids), 20)]
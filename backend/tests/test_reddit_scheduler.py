@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.services.deadline import deadline
+from backend.services.reddit_scheduler import LocalTokenBucket, RedditScheduler, search_cost
+
+
+def test_search_cost_counts_listing_pages():
+    assert search_cost(20) == 1
+    assert search_cost(250) == 3
+    # Without a limit asyncpraw pages through the whole listing
+    assert search_cost(None) == 10
+
+
+def test_synced_rate_is_restored_when_the_window_resets():
+    async def scenario():
+        bucket = LocalTokenBucket(rate=1.0, capacity=10)
+        await bucket.sync(remaining=0, seconds_to_reset=0.05)
+        assert bucket.rate < bucket.base_rate
+        # Waits for the reset, not for the floor rate
+        assert 0 < await bucket.try_take(1) <= 0.05
+
+        await asyncio.sleep(0.06)
+        assert await bucket.try_take(5) == 0
+        assert bucket.rate == bucket.base_rate
+
+    asyncio.run(scenario())
+
+
+def test_cost_above_capacity_is_admitted():
+    async def scenario():
+        bucket = LocalTokenBucket(rate=1.0, capacity=2)
+        assert await bucket.try_take(search_cost(None)) == 0
+
+    asyncio.run(scenario())
+
+
+def test_acquire_is_bounded_by_the_deadline():
+    async def scenario():
+        scheduler = RedditScheduler(LocalTokenBucket(rate=0.01, capacity=1))
+        async with scheduler.acquire("alice"):
+            pass
+
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            with deadline(0.05):
+                async with scheduler.acquire("alice"):
+                    pass
+        assert time.monotonic() - started < 1
+        await scheduler.close()
+        assert scheduler.queue_depth() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import json
+import logging
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.benchmarks.replay import Cassette, ReplayReddit
+from backend.services import search_service
+from backend.services.cache import SearchResultCache, TTLCache
+from backend.services.user_cache import CachedUser
+
+
+class FreeScheduler:
+    @asynccontextmanager
+    async def acquire(self, user_id, priority, cost=1):
+        yield
+
+    async def observe(self, reddit):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The app without its lifespan: replayed Reddit, local analysis, no database"""
+
+    async def analyze_posts(posts, corpus=None, prompt_posts=None):
+        return {"overall_sentiment": "neutral"}
+
+    async def get_background_corpus():
+        return None
+
+    @asynccontextmanager
+    async def session():
+        yield None
+
+    async def save_search_history(session, user_id, topic, result):
+        pass
+
+    monkeypatch.setattr(search_service, "search_cache", SearchResultCache(TTLCache(maxsize=8, ttl=60)))
+    monkeypatch.setattr(search_service, "reddit_scheduler", FreeScheduler())
+    monkeypatch.setattr(search_service, "analyze_posts", analyze_posts)
+    monkeypatch.setattr(search_service, "get_background_corpus", get_background_corpus)
+    monkeypatch.setattr(main, "AsyncSessionLocal", session)
+    monkeypatch.setattr(main, "save_search_history", save_search_history)
+    monkeypatch.setattr(main.app, "reddit", ReplayReddit(Cassette(), latency=0.01), raising=False)
+    main.app.dependency_overrides[main.get_current_user] = lambda: CachedUser(1, "alice", "alice@example.com", True, None)
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def request_lines(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records if record.name == "backend.requests"]
+
+
+def test_streamed_search_is_logged_with_its_stages(client, caplog):
+    caplog.set_level(logging.INFO, logger="backend.requests")
+    response = client.post("/api/search/stream", json={"topic": "python", "limit": 5})
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert response.text.splitlines()[-1] == '{"event":"done","data":{}}'
+    [line] = request_lines(caplog)
+    assert line["path"] == "/api/search/stream"
+    assert {"reddit", "scoring", "dedup"} <= set(line["spans_ms"])
+    assert line["total_ms"] >= line["spans_ms"]["reddit"]
+
+
+def test_regular_response_keeps_server_timing(client, caplog):
+    caplog.set_level(logging.INFO, logger="backend.requests")
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["server-timing"]
+    assert [line["path"] for line in request_lines(caplog)] == ["/health"]
+
+
+def test_every_cache_is_exported():
+    names = {labels["cache"] for _, labels, _ in main.collect_cache_metrics()[0][3]}
+    assert names == {"search", "analysis", "auth", "comments"}
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from backend.benchmarks.replay import Cassette, ReplayOpenAITransport, ReplayReddit
+from backend.models.search import SearchRequest
+from backend.services import ai_service, cache as cache_module, search_service
+from backend.services.cache import SearchResultCache, TTLCache
+from backend.services.deadline import DeadlineExceeded, deadline, remaining
+
+
+class FreeScheduler:
+    @asynccontextmanager
+    async def acquire(self, user_id, priority, cost=1):
+        yield
+
+    async def observe(self, reddit):
+        pass
+
+
+@pytest.fixture
+def openai_latency(monkeypatch):
+    """The real analysis against a replayed OpenAI with the returned latency setter"""
+    transport = ReplayOpenAITransport(Cassette())
+    seen = []
+    complete = ai_service._complete
+
+    async def observed_complete(messages):
+        seen.append(remaining())
+        return await complete(messages)
+
+    async def get_background_corpus():
+        return None
+
+    monkeypatch.setattr(ai_service, "client", AsyncOpenAI(
+        api_key="test", http_client=httpx.AsyncClient(transport=transport), max_retries=0,
+    ))
+    monkeypatch.setattr(ai_service, "analysis_cache", TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(ai_service, "_complete", observed_complete)
+    monkeypatch.setattr(ai_service.settings, "OPENAI_HEDGE_ENABLED", False)
+    monkeypatch.setattr(search_service, "search_cache", SearchResultCache(TTLCache(maxsize=8, ttl=60)))
+    monkeypatch.setattr(search_service, "reddit_scheduler", FreeScheduler())
+    monkeypatch.setattr(search_service, "get_background_corpus", get_background_corpus)
+    monkeypatch.setattr(cache_module, "DEADLINE_GRACE_SECONDS", 0.2)
+
+    def set_latency(seconds):
+        transport.latency = seconds
+        return seen
+
+    return set_latency
+
+
+def test_deadline_reaches_the_openai_call_and_degrades_to_lexicon(openai_latency):
+    seen = openai_latency(5.0)
+
+    async def scenario():
+        reddit = ReplayReddit(Cassette())
+        request = SearchRequest(topic="python", limit=10)
+        started = time.monotonic()
+        with deadline(0.3):
+            result = await search_service.run_search(reddit, request)
+
+        assert time.monotonic() - started < 1.0
+        assert seen and all(left is not None and left <= 0.3 for left in seen)
+        assert result["analysis"]["analysis_source"] == "lexicon"
+        assert len(result["posts"]) == 10
+
+        # The degraded result is not cached: the next search asks OpenAI again
+        openai_latency(0.0)
+        result = await search_service.run_search(reddit, request)
+        assert result["analysis"]["analysis_source"] == "llm"
+        assert reddit.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_joining_caller_extends_the_shared_deadline(openai_latency):
+    seen = openai_latency(0.4)
+
+    async def scenario():
+        reddit = ReplayReddit(Cassette(), latency=0.05)
+        request = SearchRequest(topic="python", limit=10)
+
+        async def search(seconds):
+            with deadline(seconds):
+                return await search_service.run_search(reddit, request)
+
+        short, long = await asyncio.gather(search(0.2), search(3.0), return_exceptions=True)
+        # The short caller gave up; the computation ran under the longer deadline
+        assert isinstance(short, DeadlineExceeded)
+        assert long["analysis"]["analysis_source"] == "llm"
+        assert reddit.calls == 1
+        assert all(left > 1.0 for left in seen)
+
+    asyncio.run(scenario())
+
+
+def test_slow_reddit_raises_deadline_exceeded(openai_latency):
+    openai_latency(0.0)
+
+    async def scenario():
+        reddit = ReplayReddit(Cassette(), latency=2.0)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.1):
+                await search_service.run_search(reddit, SearchRequest(topic="python", limit=10))
+        assert time.monotonic() - started < 1.0
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+from backend.services.sentiment import score_posts
+
+
+def scores(*posts):
+    posts = [{"title": title, "text": text} for title, text in posts]
+    score_posts(posts)
+    return [post["sentiment_score"] for post in posts]
+
+
+def test_typographic_apostrophe_negates():
+    curly, straight = scores(("I don’t like it", ""), ("I don't like it", ""))
+    assert curly == straight < 0
+
+
+def test_negation_does_not_cross_from_title_to_text():
+    [boundary] = scores(("Would you say no", "great tool"))
+    [text_only] = scores(("", "great tool"))
+    assert boundary == text_only > 0
+
+
+def test_negation_within_the_text():
+    [negated] = scores(("Tool review", "it is not good"))
+    assert negated < 0
+
+
+def test_missing_fields():
+    assert scores((None, None)) == [0.0]
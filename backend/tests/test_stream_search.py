@@ -0,0 +1,124 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from backend.benchmarks.replay import Cassette, ReplayReddit
+from backend.models.search import SearchRequest
+from backend.services import search_service
+from backend.services.cache import SearchResultCache, TTLCache
+from backend.services.post_store import POST_FIELDS
+
+
+class FreeScheduler:
+    @asynccontextmanager
+    async def acquire(self, user_id, priority, cost=1):
+        yield
+
+    async def observe(self, reddit):
+        pass
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """search_service with a private cache, no Reddit budget and a local-only analysis"""
+    calls = {"analyze": 0}
+
+    async def analyze_posts(posts, corpus=None, prompt_posts=None):
+        calls["analyze"] += 1
+        await asyncio.sleep(0.01)
+        return {"overall_sentiment": "neutral", "post_count": len(posts)}
+
+    async def get_background_corpus():
+        return None
+
+    monkeypatch.setattr(search_service, "search_cache", SearchResultCache(TTLCache(maxsize=8, ttl=60)))
+    monkeypatch.setattr(search_service, "reddit_scheduler", FreeScheduler())
+    monkeypatch.setattr(search_service, "analyze_posts", analyze_posts)
+    monkeypatch.setattr(search_service, "get_background_corpus", get_background_corpus)
+    return calls
+
+
+async def collect(reddit, request):
+    return [event async for event in search_service.stream_search(reddit, request)]
+
+
+def test_post_events_are_the_same_on_miss_and_hit(search):
+    async def scenario():
+        reddit = ReplayReddit(Cassette())
+        request = SearchRequest(topic="python", limit=15)
+        miss = await collect(reddit, request)
+        hit = await collect(reddit, request)
+
+        assert reddit.calls == 1
+        assert search["analyze"] == 1
+        assert [name for name, _ in miss] == [name for name, _ in hit]
+        assert [data for name, data in miss if name == "post"] == [data for name, data in hit if name == "post"]
+        for name, data in miss + hit:
+            if name == "post":
+                assert set(data) == set(POST_FIELDS)
+
+        annotations = dict(miss)["annotations"]
+        assert annotations == dict(hit)["annotations"]
+        assert len(annotations) == 15
+        assert all("sentiment_score" in fields and "cluster_size" in fields for fields in annotations.values())
+        assert [name for name, _ in miss][-3:] == ["annotations", "analysis", "result"]
+
+    asyncio.run(scenario())
+
+
+def test_stream_joins_a_search_already_running(search):
+    async def scenario():
+        reddit = ReplayReddit(Cassette(), latency=0.02)
+        request = SearchRequest(topic="python", limit=10)
+        running = asyncio.create_task(search_service.run_search(reddit, request))
+        await asyncio.sleep(0)
+        events = await collect(reddit, request)
+        result = await running
+
+        assert reddit.calls == 1
+        assert search["analyze"] == 1
+        assert dict(events)["result"]["posts"] is result["posts"]
+        assert dict(events)["analysis"]["cached"] is True
+        assert [data["id"] for name, data in events if name == "post"] == [post["id"] for post in result["posts"]]
+
+    asyncio.run(scenario())
+
+
+def test_closing_the_stream_does_not_cancel_the_search(search):
+    async def scenario():
+        reddit = ReplayReddit(Cassette(), latency=0.02)
+        request = SearchRequest(topic="python", limit=10)
+        stream = search_service.stream_search(reddit, request)
+        first = await stream.__anext__()
+        assert first[0] == "post"
+        await stream.aclose()
+
+        result = await search_service.run_search(reddit, request)
+        assert reddit.calls == 1
+        assert len(result["posts"]) == 10
+
+    asyncio.run(scenario())
+
+
+def test_cache_hit_reports_no_token_usage(search, monkeypatch):
+    async def analyze_posts(posts, corpus=None, prompt_posts=None):
+        return {"overall_sentiment": "neutral", "token_usage": {"prompt_tokens": 900, "completion_tokens": 40, "requests": 1}}
+
+    monkeypatch.setattr(search_service, "analyze_posts", analyze_posts)
+
+    async def scenario():
+        reddit = ReplayReddit(Cassette())
+        request = SearchRequest(topic="python", limit=5)
+        miss = await search_service.run_search(reddit, request)
+        hit = await search_service.run_search(reddit, request)
+        streamed = dict(await collect(reddit, request))
+
+        assert miss["analysis"]["token_usage"]["prompt_tokens"] == 900
+        assert "cached" not in miss["analysis"]
+        for analysis in (hit["analysis"], streamed["analysis"]):
+            assert analysis["cached"] is True
+            assert analysis["token_usage"] == {"prompt_tokens": 0, "completion_tokens": 0, "requests": 0}
+        assert hit["posts"] is miss["posts"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+from backend.services.text_stats import BackgroundCorpus, rank_frequent_words
+
+
+def test_term_frequency_is_normalized_per_post():
+    posts = [
+        {"title": "kernel kernel kernel kernel", "text": ""},
+        {"title": "memory", "text": ""},
+        {"title": "memory", "text": ""},
+    ]
+    # kernel: 4 occurrences in one post; memory: one whole post each, twice
+    assert rank_frequent_words(posts) == ["memory", "kernel"]
+
+
+def test_document_frequency_counts_a_post_once():
+    posts = [
+        {"title": "python python python", "text": "python"},
+        {"title": "rust", "text": "tokio"},
+    ]
+    corpus = BackgroundCorpus({"rust": 1}, num_docs=1)
+    # python is as frequent as rust but in a single post; tokio is not in the corpus
+    assert rank_frequent_words(posts, corpus) == ["python", "tokio", "rust"]
+
+
+def test_posts_without_words():
+    assert rank_frequent_words([{"title": "", "text": ""}, {"title": "a b", "text": ""}]) == []
+    assert rank_frequent_words([{"title": "", "text": ""}, {"title": "golang", "text": ""}]) == ["golang"]
@@ -0,0 +1,28 @@
+import time
+
+from backend.services.user_cache import CachedUser, UserCache
+
+
+def user(id, username):
+    return CachedUser(id, username, f"{username}@example.com", True, None)
+
+
+def test_invalidate_user_drops_every_token_of_the_user():
+    cache = UserCache(maxsize=8, ttl=60)
+    cache.set("alice-phone", user(1, "alice"))
+    cache.set("alice-laptop", user(1, "alice"))
+    cache.set("bob", user(2, "bob"))
+
+    assert cache.invalidate_user("alice") == 2
+    assert cache.get("alice-phone") is None
+    assert cache.get("alice-laptop") is None
+    assert cache.get("bob").username == "bob"
+
+
+def test_entry_never_outlives_its_token():
+    cache = UserCache(maxsize=8, ttl=60)
+    cache.set("expired", user(1, "alice"), expires_at=time.time() - 1)
+    cache.set("valid", user(1, "alice"), expires_at=time.time() + 60)
+
+    assert cache.get("expired") is None
+    assert cache.get("valid") is not None